@@ -1,6 +1,27 @@
+import json
+import os
+from functools import lru_cache
+from typing import List
+import numpy as np
 import pandas as pd
 from abc import ABC, abstractmethod
 
+KEPLER_DIR = os.path.join(os.path.dirname(__file__), "kepler")
+
+
+@lru_cache(maxsize=None)
+def _kepler_text(name: str) -> str:
+    with open(os.path.join(KEPLER_DIR, f"{name}.json"), encoding="utf-8") as file:
+        return file.read()
+
+
+def load_kepler_config(name: str) -> dict:
+    '''
+    Loads a configuration of keplergl from the ``kepler`` data folder
+    * The file is read on first use, every call returns a new object
+    '''
+    return json.loads(_kepler_text(name))
+
 
 class Anonimyzer(ABC):
     '''
@@ -38,9 +59,48 @@ class Anonimyzer(ABC):
         '''
         pass
 
+    @staticmethod
+    def assemble(
+        locs: pd.DataFrame, mod_indexes: np.ndarray, critical_cols_indxs: List[int], categorical: bool = False
+    ) -> pd.DataFrame:
+        '''
+        Builds the anonymized dataframe from the assignment array (position of the cluster center of every row)
+        * Every critical column is rebuilt on its own taking the values of the cluster centers
+        * Only non critical columns are taken from ``locs``, critical ones are never copied before being rebuilt
+                - Columns are joined without copying them again (``pandas.concat`` with ``copy=False``)
+                - With pandas copy-on-write mode (``mode.copy_on_write``) they are shared with ``locs``,
+                  peak memory grows with the number of critical columns, not with the width of the dataframe
+                - Without it they are copied, so edits over the result never reach ``locs``
+        * With ``categorical`` critical columns are built as ``pandas.Categorical``
+                - Categories are the distinct values of the cluster centers, codes come from the assignment array
+                - Written to Parquet/Arrow as dictionary encoded columns
+        '''
+        critical = set(critical_cols_indxs)
+        # columns of the result by position, the arrays of rebuilt columns are never copied again
+        columns = [
+            None if col_indx in critical else locs.iloc[:, col_indx].copy(deep=not pd.options.mode.copy_on_write)
+            for col_indx in range(locs.shape[1])
+        ]
+        if categorical:
+            is_center = np.zeros(len(locs), dtype=bool)
+            is_center[mod_indexes] = True
+            centers = np.flatnonzero(is_center)
+            center_codes = (np.cumsum(is_center) - 1)[mod_indexes]
+        for col_indx in sorted(critical):
+            if categorical:
+                # centers sharing a value share a category
+                codes, categories = pd.factorize(locs.iloc[:, col_indx].array.take(centers))
+                values = pd.Categorical.from_codes(codes[center_codes], categories)
+            else:
+                values = locs.iloc[:, col_indx].array.take(mod_indexes)
+            columns[col_indx] = pd.Series(values, index=locs.index, copy=False)
+        anon_locs = pd.concat(columns, axis=1, copy=False)
+        anon_locs.columns = locs.columns
+        return anon_locs
+
     @property
     def kepler_config(self) -> dict:
         '''
         Configuration object for correctly display in keplergl the dataframe returned by `apply_debug`
         '''
-        return {'version': 'v1', 'config': {'visState': {'filters': [{'dataId': ['h3_levels'], 'id': '4f1r8uoo8', 'name': ['hex_p'], 'type': 'range', 'value': [10, 13], 'enlarged': False, 'plotType': 'histogram', 'animationWindow': 'free', 'yAxis': None, 'speed': 1}, {'dataId': ['anon_locs'], 'id': 'unahvxar', 'name': ['time'], 'type': 'timeRange', 'value': [1642750743000, 1642751400000], 'enlarged': False, 'plotType': 'histogram', 'animationWindow': 'free', 'yAxis': None, 'speed': 1}], 'layers': [{'id': 'sht5ika', 'type': 'point', 'config': {'dataId': 'anon_locs', 'label': 'Dots', 'color': [255, 153, 31], 'highlightColor': [252, 242, 26, 255], 'columns': {'lat': 'lat1', 'lng': 'lon1', 'altitude': None}, 'isVisible': True, 'visConfig': {'radius': 1, 'fixedRadius': False, 'opacity': 0.8, 'outline': True, 'thickness': 2, 'strokeColor': [25, 20, 16], 'colorRange': {'name': 'Uber Viz Qualitative 4', 'type': 'qualitative', 'category': 'Uber', 'colors': ['#12939A', '#DDB27C', '#88572C', '#FF991F', '#F15C17', '#223F9A', '#DA70BF', '#125C77', '#4DC19C', '#776E57', '#17B8BE', '#F6D18A', '#B7885E', '#FFCB99', '#F89570', '#829AE3', '#E79FD5', '#1E96BE', '#89DAC1', '#B3AD9E']}, 'strokeColorRange': {'name': 'Global Warming', 'type': 'sequential', 'category': 'Uber', 'colors': ['#5A1846', '#900C3F', '#C70039', '#E3611C', '#F1920E', '#FFC300']}, 'radiusRange': [0, 50], 'filled': True}, 'hidden': False, 'textLabel': [{'field': None, 'color': [255, 255, 255], 'size': 18, 'offset': [0, 0], 'anchor': 'start', 'alignment': 'center'}]}, 'visualChannels': {'colorField': {'name': 'id', 'type': 'real'}, 'colorScale': 'quantile', 'strokeColorField': None, 'strokeColorScale': 'quantile', 'sizeField': None, 'sizeScale': 'linear'}}, {'id': 'zruum3f', 'type': 'line', 'config': {'dataId': 'anon_locs', 'label': 'Lines', 'color': [221, 178, 124], 'highlightColor': [252, 242, 26, 255], 'columns': {'lat0': 'lat1', 'lng0': 'lon1', 'lat1': 'lat2', 'lng1': 'lon2', 'alt0': None, 'alt1': None}, 'isVisible': True, 'visConfig': {'opacity': 0.8, 'thickness': 5, 'colorRange': {'name': 'UberPool', 'type': 'diverging', 'category': 'Uber', 'colors': ['#223F9A', '#2C51BE', '#482BBD', '#7A0DA6', '#AE0E7F', '#CF1750', '#E31A1A', '#FD7900', '#FAC200', '#FAE300']}, 'sizeRange': [0, 10], 'targetColor': None, 'elevationScale': 1}, 'hidden': False, 'textLabel': [{'field': None, 'color': [255, 255, 255], 'size': 18, 'offset': [0, 0], 'anchor': 'start', 'alignment': 'center'}]}, 'visualChannels': {'colorField': {'name': 'line_p', 'type': 'integer'}, 'colorScale': 'quantile', 'sizeField': None, 'sizeScale': 'linear'}}, {'id': 'a7i22im', 'type': 'point', 'config': {'dataId': 'anon_locs', 'label': 'Centers', 'color': [218, 112, 191], 'highlightColor': [252, 242, 26, 255], 'columns': {'lat': 'lat2', 'lng': 'lon2', 'altitude': None}, 'isVisible': True, 'visConfig': {'radius': 2, 'fixedRadius': False, 'opacity': 0.8, 'outline': True, 'thickness': 2, 'strokeColor': [25, 20, 16], 'colorRange': {'name': 'UberPool', 'type': 'diverging', 'category': 'Uber', 'colors': ['#223F9A', '#2C51BE', '#482BBD', '#7A0DA6', '#AE0E7F', '#CF1750', '#E31A1A', '#FD7900', '#FAC200', '#FAE300']}, 'strokeColorRange': {'name': 'Global Warming', 'type': 'sequential', 'category': 'Uber', 'colors': ['#5A1846', '#900C3F', '#C70039', '#E3611C', '#F1920E', '#FFC300']}, 'radiusRange': [0, 50], 'filled': True}, 'hidden': False, 'textLabel': [{'field': None, 'color': [255, 255, 255], 'size': 18, 'offset': [0, 0], 'anchor': 'start', 'alignment': 'center'}]}, 'visualChannels': {'colorField': {'name': 'center_p', 'type': 'integer'}, 'colorScale': 'quantile', 'strokeColorField': None, 'strokeColorScale': 'quantile', 'sizeField': None, 'sizeScale': 'linear'}}, {'id': 'xvdqe8k', 'type': 'hexagonId', 'config': {'dataId': 'h3_levels', 'label': 'H3 Cells', 'color': [18, 92, 119], 'highlightColor': [252, 242, 26, 255], 'columns': {'hex_id': 'h3_id'}, 'isVisible': False, 'visConfig': {'opacity': 0.8, 'colorRange': {'name': 'UberPool', 'type': 'diverging', 'category': 'Uber', 'colors': ['#223F9A', '#2C51BE', '#482BBD', '#7A0DA6', '#AE0E7F', '#CF1750', '#E31A1A', '#FD7900', '#FAC200', '#FAE300']}, 'coverage': 1, 'enable3d': False, 'sizeRange': [0, 500], 'coverageRange': [0, 1], 'elevationScale': 5, 'enableElevationZoomFactor': True}, 'hidden': False, 'textLabel': [{'field': None, 'color': [255, 255, 255], 'size': 18, 'offset': [0, 0], 'anchor': 'start', 'alignment': 'center'}]}, 'visualChannels': {'colorField': {'name': 'count', 'type': 'integer'}, 'colorScale': 'quantile', 'sizeField': None, 'sizeScale': 'linear', 'coverageField': None, 'coverageScale': 'linear'}}], 'interactionConfig': {'tooltip': {'fieldsToShow': {'anon_locs': [{'name': 'id', 'format': None}, {'name': 'time', 'format': None}, {'name': 'lat1', 'format': None}, {'name': 'lon1', 'format': None}, {'name': 'lat2', 'format': None}, {'name': 'lon2', 'format': None}, {'name': 'center_p', 'format': None}, {'name': 'line_p', 'format': None}], 'h3_levels': [{'name': 'h3_id', 'format': None}, {'name': 'count', 'format': None}, {'name': 'hex_p', 'format': None}]}, 'compareMode': False, 'compareType': 'absolute', 'enabled': True}, 'brush': {'size': 0.5, 'enabled': False}, 'geocoder': {'enabled': False}, 'coordinate': {'enabled': False}}, 'layerBlending': 'normal', 'splitMaps': [], 'animationConfig': {'currentTime': None, 'speed': 1}}, 'mapState': {'bearing': 0, 'dragRotate': False, 'latitude': 42.16613653816541, 'longitude': -8.622962015120745, 'pitch': 0, 'zoom': 16.871650945219375, 'isSplit': False}, 'mapStyle': {'styleType': 'light', 'topLayerGroups': {}, 'visibleLayerGroups': {'label': True, 'road': True, 'border': False, 'building': True, 'water': True, 'land': True, '3d building': False}, 'threeDBuildingColor': [218.82023004728686, 223.47597962276103, 223.47597962276103], 'mapStyles': {}}}}
+        return load_kepler_config("anonimyzer")
@@ -0,0 +1,87 @@
+from typing import Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+from src.application.Hexanonymity.Duplicates import key_codes
+
+SUMMARY = ("rows", "locations", "min_distinct_ids", "violating_rows", "passed")
+
+
+def audit(
+    locations: Union[np.ndarray, Sequence[np.ndarray]], ids: np.ndarray, k: int, unsafe: Optional[np.ndarray] = None
+) -> dict:
+    """
+    * Checks that every released location is shared by ``k`` distinct ids at least, or flagged as unsafe
+    * ``locations`` holds the released location of every row, as one array or as its columns (lat and lon...)
+            - Any values: ``"lat,lon"`` strings, floats, H3 cells or the assignment array of an engine
+    * ``unsafe`` if given flags the rows released knowingly without k-anonymity (outliers)
+    * Vectorized over integer codes, locations and ids are factorized once:
+            - Distinct ``(location, id)`` pairs are found by hash on a single ``int64`` code
+              and counted per location with ``numpy.bincount``
+    * Returns a dict with:
+            - ``rows``, ``locations`` -> rows and released locations
+            - ``location_codes`` -> code of the location of every row, ``distinct_ids`` -> distinct ids per code
+            - ``min_distinct_ids`` -> distinct ids of the least shared location, 0 without rows
+            - ``outliers`` -> positions of the rows in locations with less than ``k`` distinct ids
+            - ``violations`` -> codes of those locations with rows not flagged as unsafe,
+              ``violating_rows`` -> number of those rows
+            - ``passed`` -> no violations
+    """
+    columns = [locations] if isinstance(locations, (np.ndarray, pd.Series)) else locations
+    location_codes = key_codes(columns) if len(ids) else np.empty(0, dtype=np.int64)
+    id_codes, id_uniques = pd.factorize(np.asarray(ids), use_na_sentinel=False)
+    n_locations = int(location_codes.max()) + 1 if len(location_codes) else 0
+    pairs = pd.unique(location_codes * max(len(id_uniques), 1) + id_codes)
+    distinct_ids = np.bincount(pairs // max(len(id_uniques), 1), minlength=n_locations)
+    short = distinct_ids < k
+    outliers = np.flatnonzero(short[location_codes])
+    unflagged = outliers if unsafe is None else outliers[~np.asarray(unsafe, dtype=bool)[outliers]]
+    violations = np.unique(location_codes[unflagged])
+    return {
+        "rows": len(location_codes),
+        "locations": n_locations,
+        "location_codes": location_codes,
+        "distinct_ids": distinct_ids,
+        "min_distinct_ids": int(distinct_ids.min()) if n_locations else 0,
+        "outliers": outliers,
+        "violations": violations,
+        "violating_rows": len(unflagged),
+        "passed": len(unflagged) == 0,
+    }
+
+
+def audit_frames(
+    original: pd.DataFrame,
+    anonymized: pd.DataFrame,
+    id_col: str,
+    location_cols: Sequence[str],
+    k: int,
+    unsafe_col: Optional[str] = None,
+) -> dict:
+    """
+    * Same as ``audit`` for the output of an anonymization, rows of both frames in the same order
+            - Ids are taken from ``original``, released locations from the ``location_cols`` of ``anonymized``
+              (``["a"]`` for ``"lat,lon"`` or ``"h3"`` outputs, ``["a_lat", "a_lon"]`` for float outputs)
+            - ``unsafe_col`` if given is a boolean column of ``anonymized`` flagging unsafe rows
+    """
+    if len(original) != len(anonymized):
+        raise ValueError("original and anonymized frames must have the same rows")
+    return audit(
+        [anonymized[col].to_numpy() for col in location_cols],
+        original[id_col].to_numpy(),
+        k,
+        None if unsafe_col is None else anonymized[unsafe_col].to_numpy(),
+    )
+
+
+def compare(first: dict, second: dict) -> dict:
+    """
+    * Differential check of two audits of the same rows (two engines, execution modes...)
+    * Returns the summary values that differ as ``(first, second)`` pairs, plus ``same_outliers``
+      when the rows left without k-anonymity are not the same ones
+    """
+    if first["rows"] != second["rows"]:
+        raise ValueError("audits of different rows can't be compared")
+    differences = {name: (first[name], second[name]) for name in SUMMARY if first[name] != second[name]}
+    if not np.array_equal(first["outliers"], second["outliers"]):
+        differences["same_outliers"] = False
+    return differences
@@ -0,0 +1,105 @@
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from h3 import geo_to_h3, string_to_h3
+from src.application.Hexanonymity.SpilledCells import h3_parents
+
+
+def level_histograms(lats: np.ndarray, lons: np.ndarray, ids: np.ndarray, k: int, n: int) -> Dict[int, dict]:
+    """
+    * Occupancy of every precision level (15 to 0) of a sample of the points, scaled to ``n`` points:
+            - ``cells`` -> number of cells, bounded by ``n``
+            - ``groupable_share`` -> share of points in cells with ``k`` distinct ids or more
+            - ``small_share`` -> share of points in cells with less than ``k`` points
+    * Counts of a sample are scaled by ``n / len(sample)``:
+            - Cells seen once may be rare cells, their counts are kept and each one stands for that many unseen cells
+            - Counts seen twice or more are multiplied
+    """
+    scale = n / max(len(lats), 1)
+    finest = np.fromiter(
+        (string_to_h3(geo_to_h3(lat, lon, 15)) for lat, lon in zip(lats, lons)), dtype=np.uint64, count=len(lats)
+    )
+    id_codes, id_uniques = pd.factorize(np.asarray(ids))
+    levels = {}
+    for p in range(15, -1, -1):
+        cell_codes, cells = pd.factorize(h3_parents(finest, p))
+        points = np.bincount(cell_codes, minlength=len(cells))
+        # distinct (cell, id) pairs, counted by cell
+        pairs = np.unique(cell_codes.astype(np.int64) * len(id_uniques) + id_codes)
+        distinct_ids = np.bincount(pairs // max(len(id_uniques), 1), minlength=len(cells))
+        singletons = int(np.count_nonzero(points == 1))
+        levels[p] = {
+            "cells": min(int(np.ceil(len(cells) + singletons * (scale - 1))), n),
+            "groupable_share": float(np.mean((_scaled(distinct_ids, scale) >= k)[cell_codes])) if len(cells) else 0.0,
+            "small_share": float(np.mean((_scaled(points, scale) < k)[cell_codes])) if len(cells) else 0.0,
+        }
+    return levels
+
+
+def _scaled(counts: np.ndarray, scale: float) -> np.ndarray:
+    return np.where(counts >= 2, counts * scale, counts)
+
+
+@lru_cache(maxsize=None)
+def seconds_per_cell(k: int) -> float:
+    """
+    * Time the engine spends per cell and level, measured once per process with a small synthetic run
+    """
+    from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+
+    rng = np.random.default_rng(0)
+    n = 400
+    lats, lons = 42.2 + rng.random(n) / 20, -8.7 + rng.random(n) / 20
+    ids = rng.integers(0, n // 4, n).astype(str)
+    start = time.perf_counter()
+    StrictIdHexAnon(k).assign(lats, lons, ids)
+    elapsed = time.perf_counter() - start
+    levels = level_histograms(lats, lons, ids, k, n)
+    return elapsed / sum(levels[p]["cells"] for p in range(15))
+
+
+def tune_precision(
+    lats: np.ndarray,
+    lons: np.ndarray,
+    ids: np.ndarray,
+    k: int,
+    latency_budget: Optional[float] = None,
+    outlier_budget: float = 0.01,
+    sample_size: int = 20_000,
+    seed: int = 0,
+) -> dict:
+    """
+    * Recommends the precision bounds of ``StrictIdHexAnon`` for the points, from the histograms of a sample
+    * Follows this stages:
+            - ``min_p`` -> the highest precision whose cells leave at most ``outlier_budget`` of the points
+              in cells with less than ``k`` points, the ones that may end as outliers
+            - ``max_p`` -> the finest precision where some cells already have ``k`` distinct ids, finer levels
+              can't build any group and are wasted
+            - With ``latency_budget`` (seconds) ``max_p`` is lowered until the estimated runtime fits in it
+    * Runtime is estimated as the cells of every level run, times the cost per cell measured in this process
+    * Returns ``min_p``, ``max_p``, their estimated ``seconds`` and ``outlier_share`` and the histograms ``levels``
+    """
+    n = len(lats)
+    if n > sample_size:
+        sample = np.sort(np.random.default_rng(seed).choice(n, sample_size, replace=False))
+        lats, lons, ids = lats[sample], lons[sample], np.asarray(ids)[sample]
+    levels = level_histograms(lats, lons, ids, k, n)
+    min_p = max((p for p in range(15) if levels[p]["small_share"] <= outlier_budget), default=0)
+    max_p = max((p for p in range(min_p, 15) if levels[p]["groupable_share"] > 0), default=min_p)
+    cost = seconds_per_cell(k)
+
+    def seconds(max_p: int) -> float:
+        # the cells of max_p + 1 are filled and grouped first, the ones of min_p twice (dot level)
+        return cost * (sum(levels[p]["cells"] for p in range(min_p, max_p + 2)) + levels[min_p]["cells"])
+
+    while latency_budget is not None and max_p > min_p and seconds(max_p) > latency_budget:
+        max_p -= 1
+    return {
+        "min_p": min_p,
+        "max_p": max_p,
+        "seconds": seconds(max_p),
+        "outlier_share": levels[min_p]["small_share"],
+        "levels": levels,
+    }
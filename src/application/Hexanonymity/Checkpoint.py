@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+import numpy as np
+from h3 import h3_to_string, string_to_h3
+from src.application.Hexanonymity.CellStats import CellStats, Indxs, Ids
+
+
+class LevelCheckpoint:
+    """
+    * Stores on local disk the state of a clustering after every precision level, to resume interrupted runs
+    * The state is saved as ``.npy`` arrays read back memory-mapped:
+            - the assignment array
+            - the free indexes of every cell, flattened with their offsets
+            - the core table ``(core_index, core_precision, core_cell)`` of every cell, flattened with their offsets
+    * Free ids are not stored, they are rebuilt from the free indexes
+    * ``meta.json`` points to the last complete level and is replaced atomically, after its arrays are written
+    """
+
+    META = "meta.json"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def save(self, cells: Dict[str, CellStats], mod_indexes: np.ndarray, current_p: int, dot_level: bool, params: list) -> None:
+        level_dir = f"p{current_p:02d}{'-dot' if dot_level else ''}"
+        path = os.path.join(self.directory, level_dir)
+        os.makedirs(path, exist_ok=True)
+        free_counts, core_counts = [], []
+        free_indxs, core_indxs, core_ps, core_cells = [], [], [], []
+        for cell in cells.values():
+            free_counts.append(len(cell[Indxs.FREE]))
+            free_indxs.extend(cell[Indxs.FREE])
+            core_counts.append(len(cell[Indxs.CORE]))
+            for core_indx, core_p, core_cell, *_ in cell[Indxs.CORE]:
+                core_indxs.append(core_indx)
+                core_ps.append(core_p)
+                core_cells.append(string_to_h3(core_cell))
+        arrays = {
+            "mod_indexes": mod_indexes,
+            "cells": np.fromiter(map(string_to_h3, cells.keys()), dtype=np.uint64, count=len(cells)),
+            "free_offsets": np.cumsum([0, *free_counts], dtype=np.int64),
+            "free_indxs": np.array(free_indxs, dtype=np.int64),
+            "core_offsets": np.cumsum([0, *core_counts], dtype=np.int64),
+            "core_indxs": np.array(core_indxs, dtype=np.int64),
+            "core_ps": np.array(core_ps, dtype=np.int8),
+            "core_cells": np.array(core_cells, dtype=np.uint64),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+        previous = self._meta()
+        meta = {"level_dir": level_dir, "current_p": current_p, "dot_level": dot_level, "params": params}
+        with open(os.path.join(self.directory, self.META + ".tmp"), "w") as file:
+            json.dump(meta, file)
+        os.replace(os.path.join(self.directory, self.META + ".tmp"), os.path.join(self.directory, self.META))
+        if previous is not None and previous["level_dir"] != level_dir:
+            shutil.rmtree(os.path.join(self.directory, previous["level_dir"]), ignore_errors=True)
+
+    def load(self, ids: np.ndarray, k_anon: int, params: list) -> Optional[Tuple[Dict[str, CellStats], np.ndarray, int, bool]]:
+        """
+        * Returns ``(cells, mod_indexes, current_p, dot_level)`` of the last complete level, ``None`` without checkpoint
+        * Raises ``ValueError`` if the checkpoint was written by a run with other parameters or points
+        """
+        meta = self._meta()
+        if meta is None:
+            return None
+        if meta["params"] != params:
+            raise ValueError(f"checkpoint at {self.directory} belongs to a run with params {meta['params']}")
+        path = os.path.join(self.directory, meta["level_dir"])
+        arrays = {name[:-4]: np.load(os.path.join(path, name), mmap_mode="r") for name in os.listdir(path)}
+        cells: Dict[str, CellStats] = defaultdict(lambda: CellStats(k_anon))
+        free_offsets, core_offsets = arrays["free_offsets"], arrays["core_offsets"]
+        for i, h3_int in enumerate(arrays["cells"]):
+            cell = cells[h3_to_string(int(h3_int))]
+            cell[Indxs.FREE].extend(arrays["free_indxs"][free_offsets[i] : free_offsets[i + 1]].tolist())
+            cell[Ids.FREE].update(ids[cell[Indxs.FREE]])
+            for j in range(core_offsets[i], core_offsets[i + 1]):
+                core_cell = h3_to_string(int(arrays["core_cells"][j]))
+                cell[Indxs.CORE].append((int(arrays["core_indxs"][j]), int(arrays["core_ps"][j]), core_cell))
+        return cells, np.array(arrays["mod_indexes"]), meta["current_p"], meta["dot_level"]
+
+    def clear(self) -> None:
+        meta = self._meta()
+        if meta is not None:
+            os.remove(os.path.join(self.directory, self.META))
+            shutil.rmtree(os.path.join(self.directory, meta["level_dir"]), ignore_errors=True)
+
+    def _meta(self) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.directory, self.META)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import numpy as np
+import h3
+from h3 import string_to_h3
+from h3.api import basic_int
+
+# bump on any change of the layout of the file
+FORMAT_VERSION = 1
+MAGIC = "hexanonymity-coarse-cells"
+HEADER_BYTES = 4096
+# every cell at 6 is about 0.8 GB of neighbours
+MAX_RES = 6
+RING_SIZE = 7
+
+
+def generate_table(path: str, max_res: int = 4) -> None:
+    """
+    * Writes the lookup table of every H3 cell from resolution 0 to ``max_res`` to ``path``
+            - A JSON header (format version, h3 version, offsets) padded to ``HEADER_BYTES``
+            - Per resolution, the sorted ``uint64`` cells and their flowers (the cell and its neighbours)
+              as ``RING_SIZE`` columns, padded with 0 around pentagons
+    * Written aside and renamed, readers never see a partial file
+    """
+    assert 0 <= max_res <= MAX_RES
+    sections, offset = [], HEADER_BYTES
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as tmp:
+        tmp.seek(HEADER_BYTES)
+        base_cells = sorted(basic_int.get_res0_indexes())
+        for res in range(max_res + 1):
+            cells = np.array(
+                sorted(c for base in base_cells for c in basic_int.h3_to_children(base, res)), dtype=np.uint64
+            )
+            rings = np.zeros((len(cells), RING_SIZE), dtype=np.uint64)
+            for row, cell in enumerate(cells.tolist()):
+                ring = sorted(basic_int.k_ring(cell, 1))
+                rings[row, : len(ring)] = ring
+            tmp.write(cells.tobytes())
+            tmp.write(rings.tobytes())
+            sections.append({"res": res, "cells": len(cells), "offset": offset})
+            offset += cells.nbytes + rings.nbytes
+        header = {"magic": MAGIC, "version": FORMAT_VERSION, "h3": h3.__version__, "max_res": max_res, "sections": sections}
+        encoded = json.dumps(header).encode()
+        assert len(encoded) < HEADER_BYTES
+        tmp.seek(0)
+        tmp.write(encoded.ljust(HEADER_BYTES, b" "))
+    os.replace(tmp.name, path)
+
+
+def default_path(max_res: int) -> str:
+    """
+    * Path of the table of ``max_res`` in the cache directory, ``HEXANONYMITY_CACHE`` or ``~/.cache/hexanonymity``
+    """
+    directory = os.environ.get("HEXANONYMITY_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "hexanonymity"))
+    return os.path.join(directory, f"coarse-cells-v{FORMAT_VERSION}-r{max_res}.bin")
+
+
+class CoarseCells:
+    """
+    * Memory-mapped lookup table of the flowers of the coarse H3 cells, see ``generate_table``
+            - Pages are shared through the page cache by every process mapping the file
+            - Opened once per process and path, see ``open_table``
+    * Replaces ``k_ring`` in the overlap levels of ``StrictIdHexAnon`` up to ``max_res``
+            - Parents are not stored, they are bit operations already (``SpilledCells.h3_parents``)
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as table:
+            header = json.loads(table.read(HEADER_BYTES))
+        if header.get("magic") != MAGIC or header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} table of coarse cells")
+        self.path = path
+        self.max_res = header["max_res"]
+        self._cells, self._rings = [], []
+        for section in header["sections"]:
+            n, offset = section["cells"], section["offset"]
+            self._cells.append(np.memmap(path, dtype=np.uint64, mode="r", offset=offset, shape=(n,)))
+            self._rings.append(
+                np.memmap(path, dtype=np.uint64, mode="r", offset=offset + 8 * n, shape=(n, RING_SIZE))
+            )
+
+    def rings(self, cells: np.ndarray, res: int) -> np.ndarray:
+        """
+        * Flowers of the ``uint64`` ``cells`` of resolution ``res``, one row per cell padded with 0
+        """
+        return np.asarray(self._rings[res][np.searchsorted(self._cells[res], cells)])
+
+    def flower_overlaps(self, h3_ids: List[str], res: int) -> List[Tuple[str, ...]]:
+        """
+        * Cells of ``h3_ids`` (of resolution ``res``) in every flower holding two of them or more
+        * Same tuples as grouping ``k_ring`` by flower cell: members sorted, as ints or strings of the same resolution
+        """
+        if not h3_ids:
+            return []
+        cells = np.fromiter((string_to_h3(h3_id) for h3_id in h3_ids), dtype=np.uint64, count=len(h3_ids))
+        flowers = self.rings(cells, res).ravel()
+        members = np.repeat(np.arange(len(cells)), RING_SIZE)
+        valid = flowers != 0
+        flowers, members = flowers[valid], members[valid]
+        order = np.lexsort((cells[members], flowers))
+        flowers, members = flowers[order], members[order]
+        starts = np.flatnonzero(np.r_[True, flowers[1:] != flowers[:-1]])
+        ends = np.r_[starts[1:], len(flowers)]
+        shared = ends - starts > 1
+        return [tuple(h3_ids[m] for m in members[start:end].tolist()) for start, end in zip(starts[shared], ends[shared])]
+
+
+@lru_cache(maxsize=None)
+def open_table(path: Optional[str] = None, max_res: int = 4) -> CoarseCells:
+    """
+    * Opens the table at ``path``, or the one of ``max_res`` in the cache directory, generating it the first time
+    """
+    if path is None:
+        path = default_path(max_res)
+        if not os.path.exists(path):
+            generate_table(path, max_res)
+    return CoarseCells(path)
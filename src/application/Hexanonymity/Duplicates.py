@@ -0,0 +1,47 @@
+from typing import Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+
+def key_codes(keys: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    * Codes of the combinations of ``keys`` of every point, from 0 in order of first appearance
+    """
+    codes, _ = pd.factorize(np.asarray(keys[0]), use_na_sentinel=False)
+    for key in keys[1:]:
+        codes_of_key, uniques = pd.factorize(np.asarray(key), use_na_sentinel=False)
+        codes, _ = pd.factorize(codes.astype(np.int64) * len(uniques) + codes_of_key)
+    return codes.astype(np.int64, copy=False)
+
+
+def collapse_duplicates(keys: Sequence[np.ndarray], k_anon: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    * Finds the points repeating the same ``keys`` (position or cell, id...) and keeps ``k_anon`` of each at most
+            - Counts of kept points reach ``k_anon`` exactly when the counts of all the points do,
+              so location-level groups are built at the same levels
+            - Points with the same keys always fall in the same cells and move together, dropped points
+              take the assignment of the first point with their keys
+    * Returns ``(kept, firsts)``:
+            - ``kept`` -> sorted positions of the points kept
+            - ``firsts`` -> position of the first point with the keys of every point
+    """
+    n = len(keys[0])
+    codes = key_codes(keys)
+    order = np.argsort(codes, kind="stable")
+    starts = np.flatnonzero(np.r_[True, codes[order][1:] != codes[order][:-1]]) if n else np.empty(0, dtype=np.int64)
+    run_lengths = np.diff(np.r_[starts, n])
+    # occurrence of every point among the ones with its keys, in input order
+    ranks = np.empty(n, dtype=np.int64)
+    ranks[order] = np.arange(n) - np.repeat(starts, run_lengths)
+    firsts = np.empty(n, dtype=np.int64)
+    firsts[order] = np.repeat(order[starts], run_lengths)
+    return np.flatnonzero(ranks < k_anon), firsts
+
+
+def expand_assignment(sub_mod_indexes: np.ndarray, kept: np.ndarray, firsts: np.ndarray) -> np.ndarray:
+    """
+    * Translates the assignment array of the ``kept`` points back to every point, see ``collapse_duplicates``
+    """
+    mod_indexes = np.empty(len(firsts), dtype=np.int64)
+    mod_indexes[kept] = kept[sub_mod_indexes]
+    return mod_indexes[firsts] if len(kept) < len(firsts) else mod_indexes
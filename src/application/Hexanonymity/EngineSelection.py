@@ -0,0 +1,71 @@
+import os
+from typing import Optional
+
+ENGINES = ("strict", "id", "classic", "auto")
+
+# peak memory of an in-memory run of ``StrictIdHexAnon`` per point, measured with ``tracemalloc``
+BYTES_PER_POINT = 5_000
+# share of the available memory an in-memory run may take
+MEMORY_SHARE = 0.5
+# below this, process start-up costs more than the clustering it would spread
+PARALLEL_ROWS = 5_000
+
+
+def available_memory() -> Optional[int]:
+    """
+    * Memory available to new allocations in bytes, ``None`` where it can't be read
+    """
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    # kilobytes
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def choose_engine(
+    rows: int,
+    distinct_ids: int,
+    k: int,
+    min_p: int,
+    time_windows: int = 1,
+    memory: Optional[int] = None,
+    cpus: Optional[int] = None,
+    allow_spill: bool = False,
+) -> dict:
+    """
+    * Chooses how to run the ``"auto"`` engine of ``Hexanonimity`` from the size of the input
+    * The engine is always ``"strict"``, the other engines give other guarantees, only the execution changes:
+            - ``"out_of_core"`` -> the points don't fit in ``MEMORY_SHARE`` of ``memory`` and ``allow_spill``,
+              the finest levels run on disk with ``spill_cells`` cells at most in memory. Spilled levels are grouped
+              cell by cell, a lower utility than the in-memory run, so it's never chosen without ``allow_spill``
+            - ``"parallel"`` -> with several ``time_windows`` and ``PARALLEL_ROWS`` rows or more,
+              windows are clustered by ``n_jobs`` processes
+            - ``"single"`` -> otherwise, in this process
+    * With less than ``k`` ``distinct_ids`` no id-level group can be built, every level above the two of
+      ``min_p + 1`` runs cell by cell (``fast_p``), they only move points to their parents
+    * ``memory`` and ``cpus`` are the available bytes and processors, read from the system when not given
+    * Returns the choice as a dict of configuration keys, only the settings chosen are included
+            - Plus ``fits_memory``, false when the points don't fit in memory but spilling isn't allowed
+    """
+    memory = available_memory() if memory is None else memory
+    cpus = (os.cpu_count() or 1) if cpus is None else cpus
+    choice = {"engine": "strict", "execution": "single"}
+    fits_memory = memory is None or rows * BYTES_PER_POINT <= memory * MEMORY_SHARE
+    if not fits_memory and not allow_spill:
+        choice["fits_memory"] = False
+    if not fits_memory and allow_spill:
+        choice["execution"] = "out_of_core"
+        choice["spill_cells"] = max(1, int(memory * MEMORY_SHARE / BYTES_PER_POINT))
+    elif time_windows > 1 and rows >= PARALLEL_ROWS and cpus > 1:
+        choice["execution"] = "parallel"
+        choice["n_jobs"] = min(cpus, time_windows)
+    if distinct_ids < k:
+        choice["fast_p"] = min_p + 2
+    return choice
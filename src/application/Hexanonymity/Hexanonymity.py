@@ -1,43 +1,116 @@
-from typing import List, Dict, Optional
-from pandas import DataFrame
-from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+from __future__ import annotations
+import time
+from typing import TYPE_CHECKING, Dict, Hashable, List, Optional, Sequence, Tuple, Union
 from src.domain.operations.i_multifield_operation import IMultifieldOperation
 from src.domain.operations.ioperation import IOperation
-from src.domain.operations.operation_configuration import OperationConfiguration
+
+# heavy dependencies (pandas, h3, pydantic...) are imported on first use, keeping imports cheap for worker processes
+if TYPE_CHECKING:
+    import numpy as np
+    from pandas import DataFrame
+    from src.application.Hexanonymity.H3Anonimyzer import H3Anonimyzer
+    from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+    from src.infrastructure.cache.result_cache import ResultCache
+    from src.infrastructure.metrics.metrics import AnonymizationMetrics
+    from src.infrastructure.pool.worker_pool import SharedMemoryPool
+
+
+def _assign_bucket(
+    engine: H3Anonimyzer, lats: np.ndarray, lons: np.ndarray, ids: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+    import numpy as np
+
+    core_ps, unsafe = np.empty(len(lats), dtype=np.int8), np.empty(len(lats), dtype=bool)
+    return engine.assign(lats, lons, ids, core_ps, unsafe=unsafe), core_ps, unsafe, engine.stats
 
 
 class Hexanonimity(IOperation, IMultifieldOperation):
+    """
+    * Operation anonymizing the ``"lat,lon"`` column ``fields[0]`` with ``StrictIdHexAnon``
+    * Configuration keys:
+            - ``k``, ``min_p``, ``max_p`` -> parameters of the engine
+            - ``engine`` -> ``"strict"`` (default, ``StrictIdHexAnon``), ``"id"`` (``IdHexAnon``), ``"classic"``
+              (``UberH3Classic``) or ``"auto"``, the strict engine run in the way that fits the size of the data
+              and the memory available, see ``EngineSelection.choose_engine``. The choice is reported in
+              ``engine_choice`` and in ``stats["engine_choice"]``, never in the ``configuration``.
+              Levels only run on disk with ``allow_spill``, false by default
+            - ``time_bucket`` -> pandas offset alias (``"15min"``, ``"1h"``...) to give k-anonymity only within
+              every window of ``time_col``, each window is anonymized independently
+            - ``time_unit`` -> unit of ``time_col`` when it is numeric, seconds by default
+            - ``n_jobs`` -> processes anonymizing time windows in parallel, 1 by default
+            - ``output`` -> encoding of the anonymized position, ``"str"`` (default), ``"float32"``, ``"float64"``
+              or ``"h3"``, see ``H3Anonimyzer.encode_positions``
+            - ``fast_p``, ``fast_density`` -> hybrid fast mode of ``StrictIdHexAnon``, off by default
+            - ``categorical`` -> build the anonymized columns as ``pandas.Categorical``, false by default
+            - ``spill_cells`` -> cell table size from which the finest levels run on local disk, off by default.
+              Those levels don't analyze overlaps, see ``StrictIdHexAnon``
+            - ``collapse`` -> ``"exact"`` or ``"cell"``, repeated points of an id are clustered once, off by default.
+              See ``StrictIdHexAnon``
+            - ``sort_points`` -> keep the cell tables in H3 order, filled and merged by runs, false by default
+            - ``deadline`` -> seconds every run of the engine (every time window) may take, levels that would go past
+              it are degraded or skipped, see ``StrictIdHexAnon``. Off by default
+            - ``unsafe_col`` -> name of a boolean column added to the output flagging the rows left as outliers,
+              released without k-anonymity, as read by ``Audit.audit_frames``. Off by default
+            - ``coarse_res`` -> overlap levels up to this precision (at most 6) take neighbours from a memory-mapped
+              lookup table, generated once in the cache directory, see ``CoarseCells``. Off by default
+            - ``autotune`` -> choose ``min_p`` and ``max_p`` when not given from a sample of the data, see
+              ``Autotune.tune_precision``, with ``latency_budget`` (seconds) and ``outlier_budget`` (0.01 by default).
+              The recommendation is reported in ``stats["autotune"]``
+    * ``metrics`` if given records every ``apply`` and ``apply_many`` call, see ``AnonymizationMetrics``
+    * ``cache`` if given keeps the assignment arrays of ``apply``, see ``ResultCache``
+            - Running again the same configuration over the same columns only rebuilds the output frame
+            - ``stats`` of a cached result only report ``cache_hit``
+    * ``pool`` if given runs the clustering of ``apply`` in its warm workers, see ``SharedMemoryPool``
+            - Time windows are spread over the workers of the pool, ``n_jobs`` is ignored
+    """
+
     def __init__(
         self,
         fields: List[str],
         id_col: str,
         sensitive_cols: Optional[List[str]],
-        configuration: Dict[str, int],
+        configuration: Dict[str, Union[int, str]],
         working_point=0,
+        time_col: Optional[str] = None,
+        metrics: Optional[AnonymizationMetrics] = None,
+        cache: Optional[ResultCache] = None,
+        pool: Optional[SharedMemoryPool] = None,
     ):
         self._configuration = configuration
         self.id_col = id_col
         self.sensitive_cols = sensitive_cols
         self.fields = fields
         self.working_point = working_point
+        self.time_col = time_col
+        self.metrics = metrics
+        self.cache = cache
+        self.pool = pool
 
         self.k = None
         self.min_p = None
         self.max_p = None
+        self.tuning = None
+        self.engine_choice = None
+        self.stats = {}
 
     def get_multifield(self):
-        multifields = self.fields
+        multifields = list(self.fields)
         if self.id_col:
             multifields.append(self.id_col)
         if self.sensitive_cols:
             multifields += self.sensitive_cols
+        if self.time_col:
+            multifields.append(self.time_col)
         return multifields
 
     @property
     def configuration(self):
+        from src.domain.operations.operation_configuration import OperationConfiguration
+
         params = {
             "id_col": self.id_col,
             "sensitive_cols": self.sensitive_cols,
+            "time_col": self.time_col,
             "values": self._configuration,
         }  # k, min_p, max_p
         return OperationConfiguration(
@@ -48,6 +121,74 @@ class Hexanonimity(IOperation, IMultifieldOperation):
         )
 
     def apply(self, data: DataFrame) -> DataFrame:
+        """
+        * Returns the anonymized ``data`` without modifying it
+        * Only with pandas copy-on-write mode (``mode.copy_on_write``) the untouched columns are shared with ``data``
+        """
+        from src.application.Hexanonymity.H3Anonimyzer import split_latlon
+
+        start = time.perf_counter()
+        latlon_col = self.fields[0]
+        lats, lons = split_latlon(data[latlon_col].to_numpy())
+        ids = data[self.id_col].to_numpy()
+        cache_key = None if self.cache is None else self.cache.key(self, data)
+        if cache_key is not None and (cached := self.cache.get(cache_key)) is not None:
+            hexa_anonymizer, encoding, _ = self._engine()
+            mod_indexes, core_ps, unsafe = cached["mod_indexes"], cached["core_ps"], cached["unsafe"]
+            self.stats = {"cache_hit": True}
+        else:
+            buckets = self._time_buckets(data) if "time_bucket" in self._configuration else None
+            time_windows = 1 if buckets is None or not len(buckets) else int(buckets.max()) + 1
+            hexa_anonymizer, encoding, n_jobs = self._engine(lats, lons, ids, time_windows)
+            if buckets is not None:
+                mod_indexes, core_ps, unsafe, self.stats = self._assign_by_time(
+                    hexa_anonymizer, buckets, lats, lons, ids, n_jobs
+                )
+            elif self.pool is not None:
+                mod_indexes, core_ps, unsafe, self.stats = self.pool.assign(hexa_anonymizer, lats, lons, ids)
+            else:
+                mod_indexes, core_ps, unsafe, self.stats = _assign_bucket(hexa_anonymizer, lats, lons, ids)
+            if self.tuning is not None:
+                self.stats["autotune"] = self.tuning
+            if self.engine_choice is not None:
+                self.stats["engine_choice"] = self.engine_choice
+            if cache_key is not None:
+                self.cache.put(cache_key, {"mod_indexes": mod_indexes, "core_ps": core_ps, "unsafe": unsafe})
+        critical_cols = {latlon_col, *(self.sensitive_cols or [])} - ({latlon_col} if encoding != "str" else set())
+        critical_cols_indxs = [data.columns.get_loc(c) for c in critical_cols]
+        categorical = bool(self._configuration.get("categorical", False))
+        anon_data = hexa_anonymizer.assemble(data, mod_indexes, critical_cols_indxs, categorical)
+        anon_data = hexa_anonymizer.encode_positions(anon_data, latlon_col, lats, lons, mod_indexes, core_ps, encoding)
+        if (unsafe_col := self._configuration.get("unsafe_col")) is not None:
+            anon_data[unsafe_col] = unsafe
+        if self.metrics is not None:
+            self.metrics.record(time.perf_counter() - start, self.stats)
+        return anon_data
+
+    def _engine(
+        self,
+        lats: Optional[np.ndarray] = None,
+        lons: Optional[np.ndarray] = None,
+        ids: Optional[np.ndarray] = None,
+        time_windows: int = 1,
+    ) -> Tuple[H3Anonimyzer, str, int]:
+        """
+        * Validates the configuration and builds the engine
+        * With ``autotune`` the points (``lats``, ``lons``, ``ids``) choose the precision bounds not configured
+        * With the ``"auto"`` engine the points and the ``time_windows`` choose the settings not configured
+        * Returns ``(engine, output_encoding, n_jobs)``
+        """
+        import pandas as pd
+        from src.application.Hexanonymity.CoarseCells import MAX_RES
+        from src.application.Hexanonymity.EngineSelection import ENGINES, choose_engine
+        from src.application.Hexanonymity.IdHexAnon import IdHexAnon
+        from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+        from src.application.Hexanonymity.UberH3Classic import UberH3Classic
+
+        engine_name = self._configuration.get("engine", "strict")
+        if engine_name not in ENGINES:
+            raise ValueError(f"engine must be one of {ENGINES}")
+
         if "k" in self._configuration:
             self.k = int(self._configuration["k"])
             if self.k < 1:
@@ -55,23 +196,215 @@ class Hexanonimity(IOperation, IMultifieldOperation):
         else:
             self.k = 2
 
+        self.tuning, self.engine_choice = None, None
+        if self._configuration.get("autotune") and lats is not None:
+            from src.application.Hexanonymity.Autotune import tune_precision
+
+            latency_budget = self._configuration.get("latency_budget")
+            self.tuning = tune_precision(
+                lats,
+                lons,
+                ids,
+                self.k,
+                latency_budget=None if latency_budget is None else float(latency_budget),
+                outlier_budget=float(self._configuration.get("outlier_budget", 0.01)),
+            )
+
         if "min_p" in self._configuration:
             self.min_p = int(self._configuration["min_p"])
             if not 0 <= self.min_p <= 14:
                 raise ValueError("min_p must be from 0 to 14")
         else:
-            self.min_p = 0
+            self.min_p = 0 if self.tuning is None else self.tuning["min_p"]
 
         if "max_p" in self._configuration:
             self.max_p = int(self._configuration["max_p"])
             if not 0 <= self.max_p <= 14:
                 raise ValueError("max_p must be from 0 to 14")
         else:
-            self.max_p = 14
+            self.max_p = 14 if self.tuning is None else max(self.tuning["max_p"], self.min_p)
 
-        hexa_anonymizer = StrictIdHexAnon(
-            k_anon=self.k, max_p=self.max_p, min_p=self.min_p
-        )
-        return hexa_anonymizer.apply_one_col(
-            data, self.id_col, self.fields[0], *self.sensitive_cols
+        configuration = self._configuration
+        if engine_name == "auto":
+            if lats is None:
+                self.engine_choice = {"engine": "strict", "execution": "single"}
+            else:
+                self.engine_choice = choose_engine(
+                    len(lats),
+                    len(pd.unique(ids)),
+                    self.k,
+                    self.min_p,
+                    time_windows,
+                    allow_spill=bool(self._configuration.get("allow_spill", False)),
+                )
+            # configured settings take precedence over the chosen ones
+            configuration = {**self.engine_choice, **configuration}
+            engine_name = self.engine_choice["engine"]
+
+        if "n_jobs" in configuration:
+            n_jobs = int(configuration["n_jobs"])
+            if n_jobs < 1:
+                raise ValueError("n_jobs must be 1 or greater")
+        else:
+            n_jobs = 1
+
+        encoding = configuration.get("output", "str")
+        if encoding not in StrictIdHexAnon.ENCODINGS:
+            raise ValueError(f"output must be one of {StrictIdHexAnon.ENCODINGS}")
+
+        fast_p = configuration.get("fast_p")
+        if fast_p is not None and not 0 <= int(fast_p) <= 15:
+            raise ValueError("fast_p must be from 0 to 15")
+        fast_density = configuration.get("fast_density")
+        if fast_density is not None and float(fast_density) <= 0:
+            raise ValueError("fast_density must be greater than 0")
+        spill_cells = configuration.get("spill_cells")
+        if spill_cells is not None and int(spill_cells) < 0:
+            raise ValueError("spill_cells must be 0 or greater")
+        sort_points = bool(configuration.get("sort_points", False))
+        coarse_res = configuration.get("coarse_res")
+        if coarse_res is not None and not 0 <= int(coarse_res) <= MAX_RES:
+            raise ValueError(f"coarse_res must be from 0 to {MAX_RES}")
+        deadline = configuration.get("deadline")
+        if deadline is not None and float(deadline) <= 0:
+            raise ValueError("deadline must be greater than 0")
+        unsafe_col = self._configuration.get("unsafe_col")
+        if unsafe_col is not None and not isinstance(unsafe_col, str):
+            raise ValueError("unsafe_col must be a column name")
+        collapse = configuration.get("collapse")
+        if collapse is not None and collapse not in StrictIdHexAnon.COLLAPSE_MODES:
+            raise ValueError(f"collapse must be one of {StrictIdHexAnon.COLLAPSE_MODES}")
+
+        if engine_name != "strict":
+            if any(v is not None for v in (fast_p, fast_density, spill_cells, collapse, deadline, coarse_res)) or sort_points:
+                raise ValueError(
+                    "fast_p, fast_density, spill_cells, collapse, sort_points, deadline and coarse_res "
+                    "need the strict engine"
+                )
+            engine_type = IdHexAnon if engine_name == "id" else UberH3Classic
+            return engine_type(k_anon=self.k, max_p=self.max_p, min_p=self.min_p), encoding, n_jobs
+
+        engine = StrictIdHexAnon(
+            k_anon=self.k,
+            max_p=self.max_p,
+            min_p=self.min_p,
+            fast_p=None if fast_p is None else int(fast_p),
+            fast_density=None if fast_density is None else float(fast_density),
+            spill_cells=None if spill_cells is None else int(spill_cells),
+            collapse=collapse,
+            sort_points=sort_points,
+            deadline=None if deadline is None else float(deadline),
+            coarse_res=None if coarse_res is None else int(coarse_res),
         )
+        return engine, encoding, n_jobs
+
+    def apply_many(
+        self, data: Union[DataFrame, Sequence[DataFrame]], group_col: Optional[str] = None
+    ) -> Union[List[DataFrame], Dict[Hashable, DataFrame]]:
+        """
+        * Anonymizes many independent datasets in a single run of the engine, see ``StrictIdHexAnon.assign``
+        * ``data`` is either:
+                - a sequence of frames -> returns the list of their anonymized frames, in the same order
+                - one frame with ``group_col`` -> returns a dict with the anonymized rows of every value of ``group_col``
+        * Every dataset is anonymized as with its own ``apply``, the fixed cost of a run is paid once
+                - With ``time_bucket`` every window of every dataset is an independent dataset
+                - ``n_jobs``, ``spill_cells`` and ``autotune`` are ignored, there is a single run in memory
+                - Only the strict engine clusters groups, ``"auto"`` runs it
+        """
+        from src.application.Hexanonymity.H3Anonimyzer import split_latlon
+        from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+        import numpy as np
+        import pandas as pd
+
+        if isinstance(data, pd.DataFrame):
+            if group_col is None:
+                raise ValueError("apply_many over a single frame needs a group_col")
+            frame = data
+            groups, group_values = pd.factorize(data[group_col], use_na_sentinel=False)
+        else:
+            frame = pd.concat(data, ignore_index=True) if len(data) else pd.DataFrame()
+            groups = np.repeat(np.arange(len(data)), [len(part) for part in data])
+        if len(frame) == 0:
+            return {} if isinstance(data, pd.DataFrame) else [part.copy() for part in data]
+        start = time.perf_counter()
+        hexa_anonymizer, encoding, _ = self._engine()
+        if not isinstance(hexa_anonymizer, StrictIdHexAnon):
+            raise ValueError("apply_many needs the strict engine")
+        hexa_anonymizer.spill_cells = None
+        latlon_col = self.fields[0]
+        critical_cols = {latlon_col, *(self.sensitive_cols or [])} - ({latlon_col} if encoding != "str" else set())
+        critical_cols_indxs = [frame.columns.get_loc(c) for c in critical_cols]
+        lats, lons = split_latlon(frame[latlon_col].to_numpy())
+        run_groups = groups
+        if "time_bucket" in self._configuration:
+            run_groups, _ = pd.factorize(groups.astype(np.int64) * (len(frame) + 1) + self._time_buckets(frame))
+        core_ps, unsafe = np.empty(len(frame), dtype=np.int8), np.empty(len(frame), dtype=bool)
+        mod_indexes = hexa_anonymizer.assign(lats, lons, frame[self.id_col].to_numpy(), core_ps, run_groups, unsafe)
+        self.stats = hexa_anonymizer.stats
+        categorical = bool(self._configuration.get("categorical", False))
+        anon_frame = hexa_anonymizer.assemble(frame, mod_indexes, critical_cols_indxs, categorical)
+        anon_frame = hexa_anonymizer.encode_positions(anon_frame, latlon_col, lats, lons, mod_indexes, core_ps, encoding)
+        if (unsafe_col := self._configuration.get("unsafe_col")) is not None:
+            anon_frame[unsafe_col] = unsafe
+        if self.metrics is not None:
+            self.metrics.record(time.perf_counter() - start, self.stats)
+        if not isinstance(data, pd.DataFrame):
+            bounds = np.cumsum([0, *(len(part) for part in data)])
+            return [
+                anon_frame.iloc[start:end].set_axis(part.index) for part, start, end in zip(data, bounds, bounds[1:])
+            ]
+        order = np.argsort(groups, kind="stable")
+        group_positions = np.split(order, np.flatnonzero(np.diff(groups[order])) + 1)
+        return {group_values[groups[pos[0]]]: anon_frame.iloc[pos] for pos in group_positions}
+
+    def _time_buckets(self, data: DataFrame) -> np.ndarray:
+        """
+        * Returns the code of the ``time_bucket`` window of every row
+        """
+        import pandas as pd
+
+        if self.time_col is None:
+            raise ValueError("time_bucket needs a time_col")
+        times = data[self.time_col]
+        if pd.api.types.is_numeric_dtype(times):
+            times = pd.to_datetime(times, unit=self._configuration.get("time_unit", "s"))
+        buckets, _ = pd.factorize(pd.to_datetime(times).dt.floor(self._configuration["time_bucket"]))
+        return buckets
+
+    def _assign_by_time(
+        self, engine: H3Anonimyzer, buckets: np.ndarray, lats: np.ndarray, lons: np.ndarray, ids: np.ndarray, n_jobs: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+        """
+        * Clusters every window of ``time_bucket`` on its own, ``buckets`` holds the window of every row
+        * Local assignments of every window are translated back to positions of the whole frame, keeping its order
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        import numpy as np
+
+        order = np.argsort(buckets, kind="stable")
+        bucket_positions = np.split(order, np.flatnonzero(np.diff(buckets[order])) + 1) if len(order) else []
+        tasks = [(engine, lats[pos], lons[pos], ids[pos]) for pos in bucket_positions]
+        if self.pool is not None:
+            local_assignments = self.pool.assign_many(engine, [task[1:] for task in tasks])
+        elif n_jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(min(n_jobs, len(tasks))) as executor:
+                local_assignments = list(executor.map(_assign_bucket, *zip(*tasks)))
+        else:
+            local_assignments = [_assign_bucket(*task) for task in tasks]
+        mod_indexes, core_ps = np.arange(len(lats)), np.empty(len(lats), dtype=np.int8)
+        unsafe = np.zeros(len(lats), dtype=bool)
+        levels = {"fast_levels": set(), "overlap_levels": set()}
+        if "deadline" in self._configuration:
+            levels.update(degraded_levels=set(), skipped_levels=set())
+        stats = {"points": 0, "cells": 0, "cores": 0, "outliers": 0}
+        for positions, (local_mod_indexes, local_core_ps, local_unsafe, local_stats) in zip(
+            bucket_positions, local_assignments
+        ):
+            mod_indexes[positions] = positions[local_mod_indexes]
+            core_ps[positions] = local_core_ps
+            unsafe[positions] = local_unsafe
+            for name in levels:
+                levels[name].update(local_stats.get(name, ()))
+            for name in stats:
+                stats[name] += local_stats[name]
+        return mod_indexes, core_ps, unsafe, {**{name: sorted(ps, reverse=True) for name, ps in levels.items()}, **stats}
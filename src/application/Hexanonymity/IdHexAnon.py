@@ -1,10 +1,11 @@
 from collections import defaultdict
+from functools import reduce
 from typing import Optional
 import pandas as pd
 import numpy as np
 from sortedcontainers import SortedList, SortedSet
 from h3 import geo_to_h3, k_ring, h3_to_parent
-from src.application.Hexanonymity.CellStats import CellStats, CoreData
+from src.application.Hexanonymity.CellStats import CellStats, Ids, Indxs
 from src.application.Hexanonymity.H3Anonimyzer import H3Anonimyzer, safe_dist
 
 
@@ -19,6 +20,7 @@ class IdHexAnon(H3Anonimyzer):
             - From ``max_p`` until ``break_p`` (not included) anonimyzes by id -> k-anonimity
             - From ``break_p`` until ``min_p`` anonimyzes by location -> geo-indistinguishability
             - Remaining free locations beyond min_p -> geo-indistinguishability not ensured (outliers)
+    * ``stats`` reports the ``points``, ``cells``, ``cores`` and ``outliers`` of the last run, see ``assign``
     """
 
     @property
@@ -42,6 +44,7 @@ class IdHexAnon(H3Anonimyzer):
     def __init__(self, k_anon: int, max_p: int = 14, min_p: int = 0, k_break_p: Optional[int] = None):
         super().__init__(k_anon, max_p, min_p)
         self.k_break_p = k_break_p or min_p
+        self.stats = {}
 
     def __str__(self) -> str:
         min_p, _ = self.p_bounds
@@ -49,19 +52,37 @@ class IdHexAnon(H3Anonimyzer):
 
     def apply(self, locs: pd.DataFrame, id_col: str, lat_col: str, lon_col: str, *critical_cols: str) -> pd.DataFrame:
         # --asserts and prepare data structures--
-        anon_locs = locs.copy()
-        mod_indexes = np.arange(len(anon_locs))
-        id_col_indx, lat_col_indx, lon_col_indx = [anon_locs.columns.get_loc(c) for c in (id_col, lat_col, lon_col)]
-        critical_cols_indxs = list({anon_locs.columns.get_loc(c) for c in critical_cols} | {lat_col_indx, lon_col_indx})
+        id_col_indx, lat_col_indx, lon_col_indx = [locs.columns.get_loc(c) for c in (id_col, lat_col, lon_col)]
+        critical_cols_indxs = list({locs.columns.get_loc(c) for c in critical_cols} | {lat_col_indx, lon_col_indx})
+        # --algorithm--
+        mod_indexes = self.assign(
+            locs.iloc[:, lat_col_indx].to_numpy(), locs.iloc[:, lon_col_indx].to_numpy(), locs.iloc[:, id_col_indx].to_numpy()
+        )
+        # appy mods to the dataframe
+        return self.assemble(locs, mod_indexes, critical_cols_indxs)
+
+    def assign(
+        self,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        ids: np.ndarray,
+        core_ps: Optional[np.ndarray] = None,
+        unsafe: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        * Same as ``StrictIdHexAnon.assign``, without groups
+        """
+        mod_indexes = np.arange(len(lats))
         k_anon, (min_p, max_p), k_break_p = self.k_anon, self.p_bounds, self.k_break_p + 1
         current_p = max_p + 1
         cells: dict[str, CellStats] = defaultdict(lambda: CellStats(k_anon))
-        # --algorithm--
+        self.stats = {"points": len(lats)}
         # 1) Fill the cells data structure
-        for i, row in enumerate(anon_locs.itertuples(index=False)):
-            cell = cells[geo_to_h3(row[lat_col_indx], row[lon_col_indx], current_p)]
-            cell.free_indxs.append(i)
-            cell.free_ids.add(row[id_col_indx])
+        for i, (lat, lon, id_) in enumerate(zip(lats, lons, ids)):
+            cell = cells[geo_to_h3(lat, lon, current_p)]
+            cell[Indxs.FREE].append(i)
+            cell[Ids.FREE].add(id_)
+        self.stats["cells"] = len(cells)
         # 2) Group elements lowering the precision each iteration
         while current_p > min_p:
             dot_level = k_break_p >= current_p
@@ -72,40 +93,52 @@ class IdHexAnon(H3Anonimyzer):
                     flower_overlaps[flower_cell_id].add(h3_id)
             for overlap in SortedSet(((*o,) for o in flower_overlaps.values() if len(o) > 1), key=len):
                 # utility data structures
-                most_free_indxs = max(overlap, key=lambda h3_id: len(cells[h3_id].free_indxs))
-                combined = sum(map(lambda h3_id: cells[h3_id], overlap), start=CellStats(k_anon))
+                most_free_indxs = max(overlap, key=lambda h3_id: len(cells[h3_id][Indxs.FREE]))
+                combined = reduce(lambda curr, h3_id: curr.combine(cells[h3_id]), overlap, CellStats(k_anon))
                 # cluster if possible
                 core = None
-                if len(combined.free_indxs if dot_level else combined.free_ids) >= k_anon:
+                if len(combined[(Indxs if dot_level else Ids).FREE]) >= k_anon:
                     # create core with free's
                     chosen_cell = cells[most_free_indxs]
-                    core = (chosen_cell.free_indxs[0], current_p - 1, most_free_indxs)
-                    chosen_cell.core_data.append(core)
-                elif combined.free_indxs and combined.core_data:
+                    core = (chosen_cell[Indxs.FREE][0], current_p - 1, most_free_indxs)
+                    chosen_cell[Indxs.CORE].append(core)
+                elif combined[Indxs.FREE] and combined[Indxs.CORE]:
                     # attach free's to existing core
-                    highst_core_p = max(combined.core_data, key=lambda c: c[1])[1] + 1
-                    core = min(combined.core_data, key=lambda c: safe_dist(most_free_indxs, c[2], highst_core_p))
+                    highst_core_p = max(combined[Indxs.CORE], key=lambda c: c[1])[1] + 1
+                    core = min(combined[Indxs.CORE], key=lambda c: safe_dist(most_free_indxs, c[2], highst_core_p))
                 if core is not None:
                     core_indx, *_ = core
-                    mod_indexes[combined.free_indxs] = core_indx
+                    mod_indexes[combined[Indxs.FREE]] = core_indx
                     for flower_center_id in overlap:
-                        cells[flower_center_id].clear_free()
+                        for opt in (Indxs, Ids):
+                            cells[flower_center_id][opt.FREE].clear()
             # 2.2 -> Reduce precision and break if not more indexes
             current_p -= 1
             free_indxs = False
             parent_cells = defaultdict(lambda: CellStats(k_anon))
             for h3_id, cell_stats in cells.items():
-                free_indxs = free_indxs or cell_stats.free_indxs
-                parent_cells[h3_to_parent(h3_id, current_p)] += cell_stats
+                free_indxs = free_indxs or cell_stats[Indxs.FREE]
+                parent_cells[h3_to_parent(h3_id, current_p)].combine(cell_stats)
             if not free_indxs:
                 break
             cells = parent_cells
         # 3º) Add the outliers to the result
-        for outliers_grp in (outs for s in cells.values() if (outs := s.free_indxs)):
+        for outliers_grp in (outs for s in cells.values() if (outs := s[Indxs.FREE])):
             mod_indexes[outliers_grp] = outliers_grp[0]
-        # appy mods to the dataframe
-        anon_locs.iloc[:, critical_cols_indxs] = anon_locs.iloc[mod_indexes, critical_cols_indxs].reset_index(drop=True)
-        return anon_locs
+        self.stats["cores"] = sum(len(cell[Indxs.CORE]) for cell in cells.values())
+        self.stats["outliers"] = sum(len(cell[Indxs.FREE]) for cell in cells.values())
+        if unsafe is not None:
+            unsafe[:] = False
+            for outliers_grp in (outs for s in cells.values() if (outs := s[Indxs.FREE])):
+                unsafe[outliers_grp] = True
+        if core_ps is not None:
+            core_ps[:] = min_p
+            for cell in cells.values():
+                for core_indx, core_p, *_ in cell[Indxs.CORE]:
+                    core_ps[core_indx] = core_p
+                if outs := cell[Indxs.FREE]:
+                    core_ps[outs[0]] = current_p
+        return mod_indexes
 
     def apply_debug(self, locs: pd.DataFrame, id_col: str, lat_col: str, lon_col: str, time_col: str) -> pd.DataFrame:
         # --asserts and prepare data structures--
@@ -127,8 +160,8 @@ class IdHexAnon(H3Anonimyzer):
         # 1) Fill the cells data structure
         for i, row in enumerate(anon_locs.itertuples(index=False)):
             cell = cells[geo_to_h3(row[col("lat1")], row[col("lon1")], current_p)]
-            cell.free_indxs.append(i)
-            cell.free_ids.add(row[col("id")])
+            cell[Indxs.FREE].append(i)
+            cell[Ids.FREE].add(row[col("id")])
         # 2) Group elements lowering the precision each iteration
         while current_p > min_p:
             dot_level = k_break_p >= current_p
@@ -139,38 +172,39 @@ class IdHexAnon(H3Anonimyzer):
                     flower_overlaps[flower_cell_id].add(h3_id)
             for overlap in SortedSet(((*o,) for o in flower_overlaps.values() if len(o) > 1), key=len):
                 # utility data structures
-                most_free_indxs = max(overlap, key=lambda h3_id: len(cells[h3_id].free_indxs))
-                combined = sum(map(lambda h3_id: cells[h3_id], overlap), start=CellStats(k_anon))
+                most_free_indxs = max(overlap, key=lambda h3_id: len(cells[h3_id][Indxs.FREE]))
+                combined = reduce(lambda curr, h3_id: curr.combine(cells[h3_id]), overlap, CellStats(k_anon))
                 # cluster if possible
                 core = None
-                if len(combined.free_indxs if dot_level else combined.free_ids) >= k_anon:
+                if len(combined[(Indxs if dot_level else Ids).FREE]) >= k_anon:
                     # create core with free's
                     chosen_cell = cells[most_free_indxs]
-                    core: CoreData = (chosen_cell.free_indxs[0], current_p - 1, most_free_indxs)
-                    chosen_cell.core_data.append(core)
-                elif combined.free_indxs and combined.core_data:
+                    core = (chosen_cell[Indxs.FREE][0], current_p - 1, most_free_indxs)
+                    chosen_cell[Indxs.CORE].append(core)
+                elif combined[Indxs.FREE] and combined[Indxs.CORE]:
                     # attach free's to existing core
-                    highst_core_p = max(combined.core_data, key=lambda c: c[1])[1] + 1
-                    core = min(combined.core_data, key=lambda c: safe_dist(most_free_indxs, c[2], highst_core_p))
+                    highst_core_p = max(combined[Indxs.CORE], key=lambda c: c[1])[1] + 1
+                    core = min(combined[Indxs.CORE], key=lambda c: safe_dist(most_free_indxs, c[2], highst_core_p))
                 if core is not None:
                     core_indx, core_p, *_ = core
-                    mod_loc_indxs[combined.free_indxs] = core_indx
-                    prec_vals[combined.free_indxs] = (core_p, current_p - 1)
-                    safe_vals[combined.free_indxs] = (1, 0, 0) if core_p + 1 > k_break_p else (0, 1, 0)
+                    mod_loc_indxs[combined[Indxs.FREE]] = core_indx
+                    prec_vals[combined[Indxs.FREE]] = (core_p, current_p - 1)
+                    safe_vals[combined[Indxs.FREE]] = (1, 0, 0) if core_p + 1 > k_break_p else (0, 1, 0)
                     for flower_center_id in overlap:
-                        cells[flower_center_id].clear_free()
+                        for opt in (Indxs, Ids):
+                            cells[flower_center_id][opt.FREE].clear()
             # 2.2 -> Reduce precision and break if not more indexes
             current_p -= 1
             free_indxs = False
             parent_cells: dict[str, CellStats] = defaultdict(lambda: CellStats(k_anon))
             for h3_id, cell_stats in cells.items():
-                free_indxs = free_indxs or cell_stats.free_indxs
-                parent_cells[h3_to_parent(h3_id, current_p)] += cell_stats
+                free_indxs = free_indxs or cell_stats[Indxs.FREE]
+                parent_cells[h3_to_parent(h3_id, current_p)].combine(cell_stats)
             if not free_indxs:
                 break
             cells = parent_cells
         # 3º) Add the outliers to the result
-        for outliers_grp in (outs for s in cells.values() if (outs := s.free_indxs)):
+        for outliers_grp in (outs for s in cells.values() if (outs := s[Indxs.FREE])):
             mod_loc_indxs[outliers_grp] = outliers_grp[0]
             prec_vals[outliers_grp] = (current_p, current_p)
             safe_vals[outliers_grp] = (0, 0, 1)
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+from h3 import geo_to_h3, string_to_h3
+from src.application.Hexanonymity.H3Anonimyzer import split_latlon
+from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+
+
+class IncrementalHexAnon(StrictIdHexAnon):
+    """
+    * StrictIdHexAnon over an archive that only grows, clustering only the new points and the outliers they touch
+    * Every cell of ``min_p`` is clustered on its own, so the whole archive is k-anonymous cell by cell
+            - Clusters never cross ``min_p`` cells, results may differ from a one-shot run near cell borders
+    * Keeps the positions, ids, ``min_p`` cell, assignment and ``unsafe`` flag of every archived point
+            - Released clusters never change, appending points clusters only the new points and the outliers
+              (``unsafe``) of the ``min_p`` cells they fall in
+            - Points of those left as outliers join the nearest released cluster of their cell, the one sharing
+              their finest parent cell, see ``_attach``
+            - The state survives between runs with ``save`` and ``load``
+    """
+
+    def __init__(self, k_anon: int, max_p: int = 14, min_p: int = 0):
+        super().__init__(k_anon, max_p, min_p)
+        self.lats = np.empty(0)
+        self.lons = np.empty(0)
+        self.ids = np.empty(0, dtype=str)
+        self.cells = np.empty(0, dtype=np.uint64)
+        self.mod_indexes = np.empty(0, dtype=np.int64)
+        self.unsafe = np.empty(0, dtype=bool)
+        self.touched_cells = 0
+
+    def __str__(self) -> str:
+        return "IncrementalStrictIdHexanon"
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def append(self, lats: np.ndarray, lons: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        """
+        * Adds points at the end of the archive and clusters them with the outliers of the ``min_p`` cells they touch
+        * Ids are compared as strings
+        * Returns the assignment array of the whole archive
+        """
+        min_p, _ = self.p_bounds
+        new_cells = np.fromiter(
+            (string_to_h3(geo_to_h3(lat, lon, min_p)) for lat, lon in zip(lats, lons)), dtype=np.uint64, count=len(lats)
+        )
+        offset = len(self)
+        self.lats = np.concatenate((self.lats, lats))
+        self.lons = np.concatenate((self.lons, lons))
+        self.ids = np.concatenate((self.ids, np.asarray(ids).astype(str)))
+        self.cells = np.concatenate((self.cells, new_cells))
+        self.mod_indexes = np.concatenate((self.mod_indexes, np.arange(offset, len(self))))
+        self.unsafe = np.concatenate((self.unsafe, np.ones(len(lats), dtype=bool)))
+        # cluster the points still free of every touched cell on their own
+        positions = np.flatnonzero(np.isin(self.cells, np.unique(new_cells)) & self.unsafe)
+        positions = positions[np.argsort(self.cells[positions], kind="stable")]
+        cell_positions = np.split(positions, np.flatnonzero(np.diff(self.cells[positions])) + 1) if len(positions) else []
+        for cell_pos in cell_positions:
+            local_unsafe = np.empty(len(cell_pos), dtype=bool)
+            local_mod_indexes = self.assign(
+                self.lats[cell_pos], self.lons[cell_pos], self.ids[cell_pos], unsafe=local_unsafe
+            )
+            self.mod_indexes[cell_pos] = cell_pos[local_mod_indexes]
+            self.unsafe[cell_pos] = local_unsafe
+            if local_unsafe.any():
+                self._attach(cell_pos[local_unsafe])
+        self.touched_cells = len(cell_positions)
+        return self.mod_indexes
+
+    def _attach(self, positions: np.ndarray) -> None:
+        """
+        * Moves the outliers at ``positions`` (of the same ``min_p`` cell) to the released clusters of their cell
+                - To the cluster whose center shares the finest parent cell with the point
+                - Joining a k-anonymous cluster keeps it k-anonymous, the outliers are no longer unsafe
+        * Outliers are kept as they are in cells without released clusters
+        """
+        min_p, max_p = self.p_bounds
+        centers = np.unique(self.mod_indexes[(self.cells == self.cells[positions[0]]) & ~self.unsafe])
+        for p in range(max_p, min_p - 1, -1):
+            if not len(centers) or not len(positions):
+                return
+            center_cells = {}
+            for center in centers.tolist():
+                center_cells.setdefault(geo_to_h3(self.lats[center], self.lons[center], p), center)
+            attached = [
+                (position, center)
+                for position in positions.tolist()
+                if (center := center_cells.get(geo_to_h3(self.lats[position], self.lons[position], p))) is not None
+            ]
+            for position, center in attached:
+                self.mod_indexes[position] = center
+                self.unsafe[position] = False
+            positions = positions[self.unsafe[positions]]
+
+    def apply_append(
+        self, archive: pd.DataFrame, new_locs: pd.DataFrame, id_col: str, latlon_col: str, *critical_cols: str
+    ) -> pd.DataFrame:
+        """
+        * Same as ``apply_one_col`` over the concatenation of ``archive`` and ``new_locs``
+        * ``archive`` is the original (not anonymized) data already appended, in the same order
+        * Returns the anonymized archive including the new rows
+        """
+        assert len(archive) == len(self), "archive doesn't match the appended points"
+        lats, lons = split_latlon(new_locs[latlon_col].to_numpy())
+        mod_indexes = self.append(lats, lons, new_locs[id_col].to_numpy())
+        locs = pd.concat((archive, new_locs), ignore_index=True)
+        critical_cols_indxs = [locs.columns.get_loc(c) for c in {latlon_col, *critical_cols}]
+        return self.assemble(locs, mod_indexes, critical_cols_indxs)
+
+    def save(self, path: str) -> None:
+        """
+        * Writes the state of the archive to a ``.npz`` file
+        """
+        min_p, max_p = self.p_bounds
+        np.savez(
+            path,
+            params=np.array([self.k_anon, max_p, min_p]),
+            lats=self.lats,
+            lons=self.lons,
+            ids=self.ids,
+            cells=self.cells,
+            mod_indexes=self.mod_indexes,
+            unsafe=self.unsafe,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IncrementalHexAnon":
+        with np.load(path) as state:
+            k_anon, max_p, min_p = state["params"]
+            anonymizer = cls(int(k_anon), int(max_p), int(min_p))
+            for name in ("lats", "lons", "ids", "cells", "mod_indexes", "unsafe"):
+                setattr(anonymizer, name, state[name])
+        return anonymizer
@@ -0,0 +1,153 @@
+import os
+import tempfile
+from collections import defaultdict
+from typing import Dict, Optional
+import numpy as np
+from h3 import h3_to_string
+from src.application.Hexanonymity.CellStats import CellStats, Ids, Indxs
+
+_RES_MASK = np.uint64(0xF << 52)
+
+
+def h3_parents(cells: np.ndarray, p: int) -> np.ndarray:
+    """
+    * Vectorized ``h3_to_parent`` over ``uint64`` cells of a finer precision than ``p``
+    * Sets the resolution field to ``p`` and the digits of the finer resolutions to 7 (unused)
+            - Monotone: the parents of sorted cells are sorted
+    """
+    return (cells & ~_RES_MASK) | np.uint64(p << 52) | np.uint64((1 << (3 * (15 - p))) - 1)
+
+
+class SpilledCells:
+    """
+    * Cell table of the finest precision levels kept on local disk, as memory-mapped arrays sorted by cell
+            - One row per free point: ``cells`` (``uint64`` cell at the current precision), ``indxs`` and ``ids`` (id codes)
+            - Every level is a pass over the rows in chunks of ``chunk_rows``, cut at cell boundaries
+            - The rows still free are written with their parent cell, already sorted for the next level
+            - Two sets of files are used in turns, disk usage is bounded by twice the points
+    * Levels are grouped cell by cell, like the fast levels of ``StrictIdHexAnon``, overlaps are not analyzed
+            - A cell with ``k`` distinct ids creates a core with its first point
+            - Otherwise its free points join the first core created in the cell, if any
+    * Cores are few and kept in memory, ``to_cells`` gives back the usual ``CellStats`` table
+    """
+
+    def __init__(self, k_anon: int, directory: Optional[str] = None, chunk_rows: int = 1_000_000):
+        self.k_anon = k_anon
+        self.chunk_rows = chunk_rows
+        self._tmp = tempfile.TemporaryDirectory(prefix="hexanonymity-spill-", dir=directory)
+        self._turn = 0
+        self.rows = 0
+        self.n_cells = 0
+        self.core_indxs = np.empty(0, dtype=np.int64)
+        self.core_ps = np.empty(0, dtype=np.int8)
+        self.core_origins = np.empty(0, dtype=np.uint64)
+        self.core_cells = np.empty(0, dtype=np.uint64)
+
+    def _open(self, turn: int, rows: int, mode: str) -> Dict[str, np.ndarray]:
+        dtypes = {"cells": np.uint64, "indxs": np.int64, "ids": np.int64}
+        paths = {name: os.path.join(self._tmp.name, f"{name}-{turn}.npy") for name in dtypes}
+        if mode == "r":
+            return {name: np.load(path, mmap_mode="r")[:rows] for name, path in paths.items()}
+        return {
+            name: np.lib.format.open_memmap(path, mode="w+", dtype=dtypes[name], shape=(max(rows, 1),))
+            for name, path in paths.items()
+        }
+
+    def fill(self, cells: np.ndarray, id_codes: np.ndarray) -> None:
+        """
+        * Writes the points, ``cells`` holds the cell of every point at the first precision
+        """
+        order = np.argsort(cells, kind="stable")
+        arrays = self._open(self._turn, len(cells), "w+")
+        arrays["cells"][: len(cells)] = cells[order]
+        arrays["indxs"][: len(cells)] = order
+        arrays["ids"][: len(cells)] = id_codes[order]
+        for array in arrays.values():
+            array.flush()
+        self.rows = len(cells)
+        self.n_cells = int(np.count_nonzero(np.diff(cells[order]))) + 1 if len(cells) else 0
+
+    def group_level(self, mod_indexes: np.ndarray, current_p: int) -> None:
+        """
+        * Groups the cells of ``current_p`` and moves the free points to the cells of ``current_p - 1``
+        """
+        src = self._open(self._turn, self.rows, "r")
+        dst = self._open(1 - self._turn, self.rows, "w+")
+        written, n_cells, last_parent = 0, 0, None
+        new_cores = []
+        core_order = np.argsort(self.core_cells, kind="stable")
+        sorted_core_cells = self.core_cells[core_order]
+        start = 0
+        while start < self.rows:
+            # cut the chunk at a cell boundary
+            end = min(start + self.chunk_rows, self.rows)
+            if end < self.rows:
+                end = int(np.searchsorted(src["cells"], src["cells"][end - 1], side="right"))
+            cells, indxs, ids = (np.asarray(src[name][start:end]) for name in ("cells", "indxs", "ids"))
+            run_starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+            run_cells = cells[run_starts]
+            run_of_row = np.repeat(np.arange(len(run_starts)), np.diff(np.r_[run_starts, len(cells)]))
+            # distinct ids of every cell
+            pair_order = np.lexsort((ids, cells))
+            pair_cells, pair_ids = cells[pair_order], ids[pair_order]
+            new_pair = np.r_[True, (pair_cells[1:] != pair_cells[:-1]) | (pair_ids[1:] != pair_ids[:-1])]
+            distinct = np.add.reduceat(new_pair.astype(np.int64), run_starts)
+            # create cores, or join the first core of the cell
+            creates = distinct >= self.k_anon
+            if len(sorted_core_cells):
+                core_pos = np.minimum(np.searchsorted(sorted_core_cells, run_cells), len(sorted_core_cells) - 1)
+                has_core = sorted_core_cells[core_pos] == run_cells
+            else:
+                core_pos, has_core = np.zeros(len(run_cells), dtype=np.int64), np.zeros(len(run_cells), dtype=bool)
+            run_targets = np.full(len(run_starts), -1, dtype=np.int64)
+            run_targets[creates] = indxs[run_starts[creates]]
+            joins = ~creates & has_core
+            run_targets[joins] = self.core_indxs[core_order[core_pos[joins]]]
+            row_targets = run_targets[run_of_row]
+            grouped = row_targets >= 0
+            mod_indexes[indxs[grouped]] = row_targets[grouped]
+            new_cores.append((indxs[run_starts[creates]], run_cells[creates]))
+            # free points go to their parent cell
+            free = ~grouped
+            parents = h3_parents(cells[free], current_p - 1)
+            count = len(parents)
+            dst["cells"][written : written + count] = parents
+            dst["indxs"][written : written + count] = indxs[free]
+            dst["ids"][written : written + count] = ids[free]
+            if count:
+                changes = int(np.count_nonzero(parents[1:] != parents[:-1])) + 1
+                n_cells += changes - (1 if parents[0] == last_parent else 0)
+                last_parent = parents[-1]
+            written += count
+            start = end
+        for array in dst.values():
+            array.flush()
+        del src, dst
+        self._turn, self.rows, self.n_cells = 1 - self._turn, written, n_cells
+        created_indxs = np.concatenate([indxs for indxs, _ in new_cores]) if new_cores else np.empty(0, dtype=np.int64)
+        created_cells = np.concatenate([cells for _, cells in new_cores]) if new_cores else np.empty(0, dtype=np.uint64)
+        self.core_indxs = np.concatenate((self.core_indxs, created_indxs))
+        self.core_ps = np.concatenate((self.core_ps, np.full(len(created_indxs), current_p, dtype=np.int8)))
+        self.core_origins = np.concatenate((self.core_origins, created_cells))
+        self.core_cells = h3_parents(np.concatenate((self.core_cells, created_cells)), current_p - 1)
+
+    def to_cells(self, ids: np.ndarray) -> Dict[str, CellStats]:
+        """
+        * Returns the ``CellStats`` table of the current precision, with the free points and every core
+        """
+        k_anon = self.k_anon
+        cells: Dict[str, CellStats] = defaultdict(lambda: CellStats(k_anon))
+        arrays = self._open(self._turn, self.rows, "r")
+        for cell_int, indx in zip(np.asarray(arrays["cells"]).tolist(), np.asarray(arrays["indxs"]).tolist()):
+            cell = cells[h3_to_string(cell_int)]
+            cell[Indxs.FREE].append(indx)
+            cell[Ids.FREE].add(ids[indx])
+        del arrays
+        for indx, p, origin, cell_int in zip(
+            self.core_indxs.tolist(), self.core_ps.tolist(), self.core_origins.tolist(), self.core_cells.tolist()
+        ):
+            cells[h3_to_string(cell_int)][Indxs.CORE].append((indx, p, h3_to_string(origin)))
+        return cells
+
+    def close(self) -> None:
+        self._tmp.cleanup()
@@ -1,12 +1,44 @@
+import hashlib
+import time
 from collections import defaultdict
 from functools import reduce
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
 import pandas as pd
 import numpy as np
 from sortedcontainers import SortedList, SortedSet
-from h3 import geo_to_h3, k_ring, h3_to_parent
+from h3 import geo_to_h3, k_ring, h3_to_parent, h3_to_string, string_to_h3
 from src.application.Hexanonymity.H3Anonimyzer import H3Anonimyzer
+from src.application.Hexanonymity.Autotune import seconds_per_cell
 from src.application.Hexanonymity.CellStats import CellStats, Indxs, Ids
-from src.application.Hexanonymity.H3Anonimyzer import safe_dist
+from src.application.Hexanonymity.Checkpoint import LevelCheckpoint
+from src.application.Hexanonymity.CoarseCells import CoarseCells, open_table
+from src.application.Hexanonymity.Duplicates import collapse_duplicates, expand_assignment
+from src.application.Hexanonymity.SpilledCells import SpilledCells
+from src.application.Hexanonymity.H3Anonimyzer import safe_dist, split_latlon
+
+
+class CellKeys(NamedTuple):
+    """
+    * How the engine moves through the keys of its cell tables
+            - ``ring`` -> keys of the flower of a cell, the cell and its neighbours
+            - ``parent`` -> key of the parent cell at the given precision
+            - ``h3`` -> H3 cell of the key
+    """
+
+    ring: Callable
+    parent: Callable
+    h3: Callable
+
+
+# plain H3 cells, every point shares the same space
+H3_KEYS = CellKeys(lambda h3_id: k_ring(h3_id, 1), h3_to_parent, lambda h3_id: h3_id)
+# ``(group, cell)`` pairs, cells of different groups never overlap nor share a parent
+GROUP_KEYS = CellKeys(
+    lambda key: [(key[0], h3_id) for h3_id in k_ring(key[1], 1)],
+    lambda key, p: (key[0], h3_to_parent(key[1], p)),
+    lambda key: key[1],
+)
+
 
 class StrictIdHexAnon(H3Anonimyzer):
     """
@@ -15,10 +47,80 @@ class StrictIdHexAnon(H3Anonimyzer):
             - Build groups from ``max_p`` to ``min_p`` with id_level protection
             - Build groups with ``min_p`` with loc_level protection
             - Group remaining locations in the same cell of ``min_p``
+    * With ``checkpoint_dir`` the state is saved after every precision level
+            - With ``resume`` a run continues from the last level saved, instead of starting again from ``max_p``
+            - Only from a checkpoint of the same points and options, see ``_checkpoint_params``
+            - The checkpoint is removed once the run ends
+    * Hybrid fast mode, groups are built cell by cell like ``UberH3Classic`` in levels:
+            - at ``fast_p`` precision or finer
+            - with ``fast_density`` free points per cell or more
+            - Flower overlaps are only analyzed in the other levels, trading a bit of utility for speed
+            - ``stats`` reports the levels run each way in the last run
+    * ``stats`` also reports the ``points``, ``cells`` (largest cell table), ``cores`` and ``outliers`` of the last run
+    * Independent datasets are clustered in a single run with ``groups``, see ``assign``
+    * With ``spill_cells`` the finest levels run over a cell table on local disk (in ``spill_dir``), see ``SpilledCells``
+            - While a level has more than ``spill_cells`` cells, down to ``min_p + 2``
+            - Spilled levels are grouped cell by cell, like fast levels: overlaps between neighbour cells are not
+              analyzed, the result is the one of ``fast_p`` at the last spilled level, with fewer and larger groups
+              than a run in memory
+            - The usual in-memory table is built once the table shrinks below ``spill_cells`` cells
+    * With ``collapse`` repeated points of the same id are clustered once, see ``Duplicates.collapse_duplicates``
+            - ``"exact"`` -> points with the same position and id
+            - ``"cell"`` -> points with the same id in the same cell of the finest level (``max_p + 1``)
+            - ``stats`` reports the ``collapsed`` points, the ones left out of the cell tables
+    * With ``sort_points`` the cell tables are kept in H3 order, see ``_sorted_cells`` and ``_merge_runs``
+            - Points are placed by runs of the sorted order instead of one by one
+            - Parents are built from runs of children, reusing the first child instead of copying it
+            - Points keep their positions, results are in the order of the input
+    * With ``deadline`` (seconds) a run degrades gracefully instead of going past it, time is checked per level:
+            - A level whose overlaps are expected to end past the deadline is grouped cell by cell, like fast levels,
+              still building groups of ``k`` distinct ids. The cost per cell is measured on the overlap levels run,
+              and estimated with ``Autotune.seconds_per_cell`` before the first one
+            - Once the deadline has passed, the levels left are skipped and replaced by a single pass grouping
+              cell by cell the free points of every cell of ``min_p``, only with ``k`` distinct ids.
+              The points left are outliers, flagged as unsafe (see ``assign``)
+            - ``stats`` reports the ``degraded_levels`` (also in ``fast_levels``) and the ``skipped_levels``
+    * With ``coarse_res`` overlap levels up to that precision take the flowers of their cells from a lookup table
+      instead of ``k_ring``, see ``CoarseCells``
+            - ``coarse_table`` is the path of the table, the one of ``coarse_res`` is generated in the cache directory
+              the first time if not given
+            - Levels of ``groups`` runs always use ``k_ring``
     """
 
-    def __init__(self, k_anon: int, max_p: int = 14, min_p: int = 0):
+    COLLAPSE_MODES = ("exact", "cell")
+
+    def __init__(
+        self,
+        k_anon: int,
+        max_p: int = 14,
+        min_p: int = 0,
+        checkpoint_dir: Optional[str] = None,
+        resume: bool = False,
+        fast_p: Optional[int] = None,
+        fast_density: Optional[float] = None,
+        spill_cells: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        collapse: Optional[str] = None,
+        sort_points: bool = False,
+        deadline: Optional[float] = None,
+        coarse_res: Optional[int] = None,
+        coarse_table: Optional[str] = None,
+    ):
         super().__init__(k_anon, max_p, min_p)
+        assert collapse is None or collapse in self.COLLAPSE_MODES
+        self.checkpoint_dir = checkpoint_dir
+        self.resume = resume
+        self.fast_p = fast_p
+        self.fast_density = fast_density
+        self.spill_cells = spill_cells
+        self.spill_dir = spill_dir
+        self.collapse = collapse
+        self.sort_points = sort_points
+        self.deadline = deadline
+        self.coarse_res = coarse_res
+        self.coarse_table = coarse_table
+        self.stats = {}
+        self._outlier_heads = []
 
     def __str__(self) -> str:
         return "StrictIdHexanon"
@@ -26,138 +128,383 @@ class StrictIdHexAnon(H3Anonimyzer):
     def __repr__(self) -> str:
         return "Hexanonimity"
 
-    def apply(self, locs: pd.DataFrame, id_col: str, lat_col: str, lon_col: str, *critical_cols: str) -> pd.DataFrame:
+    def apply(
+        self, locs: pd.DataFrame, id_col: str, lat_col: str, lon_col: str, *critical_cols: str, categorical: bool = False
+    ) -> pd.DataFrame:
+        # --asserts and prepare data structures--
+        id_col_indx, lat_col_indx, lon_col_indx = [locs.columns.get_loc(c) for c in (id_col, lat_col, lon_col)]
+        critical_cols_indxs = list({locs.columns.get_loc(c) for c in critical_cols} | {lat_col_indx, lon_col_indx})
+        # --algorithm--
+        mod_indexes = self.assign(
+            locs.iloc[:, lat_col_indx].to_numpy(), locs.iloc[:, lon_col_indx].to_numpy(), locs.iloc[:, id_col_indx].to_numpy()
+        )
+        # appy mods to the dataframe
+        return self.assemble(locs, mod_indexes, critical_cols_indxs, categorical)
+
+    def apply_one_col(
+        self,
+        locs: pd.DataFrame,
+        id_col: str,
+        latlon_col: str,
+        *critical_cols: str,
+        encoding: str = "str",
+        categorical: bool = False,
+    ) -> pd.DataFrame:
+        """
+        * Same as ``apply`` with the position in a single ``"lat,lon"`` column
+        * ``encoding`` selects how the anonymized position is written, see ``H3Anonimyzer.encode_positions``
+        * ``categorical`` builds critical columns as ``pandas.Categorical``, see ``Anonimyzer.assemble``
+        """
         # --asserts and prepare data structures--
-        anon_locs = locs.copy()
-        mod_indexes = np.arange(len(anon_locs))
-        id_col_indx, lat_col_indx, lon_col_indx = [anon_locs.columns.get_loc(c) for c in (id_col, lat_col, lon_col)]
-        critical_cols_indxs = list({anon_locs.columns.get_loc(c) for c in critical_cols} | {lat_col_indx, lon_col_indx})
+        id_col_indx, latlon_col_indx = [locs.columns.get_loc(c) for c in (id_col, latlon_col)]
+        critical_cols_indxs = list({locs.columns.get_loc(c) for c in critical_cols} | {latlon_col_indx})
+        # --algorithm--
+        lats, lons = split_latlon(locs.iloc[:, latlon_col_indx].to_numpy())
+        core_ps = np.empty(len(locs), dtype=np.int8)
+        mod_indexes = self.assign(lats, lons, locs.iloc[:, id_col_indx].to_numpy(), core_ps)
+        # appy mods to the dataframe
+        if encoding != "str":
+            critical_cols_indxs.remove(latlon_col_indx)
+        anon_locs = self.assemble(locs, mod_indexes, critical_cols_indxs, categorical)
+        return self.encode_positions(anon_locs, latlon_col, lats, lons, mod_indexes, core_ps, encoding)
+
+    def assign(
+        self,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        ids: np.ndarray,
+        core_ps: Optional[np.ndarray] = None,
+        groups: Optional[np.ndarray] = None,
+        unsafe: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        * Runs the clustering over the positions of the points
+        * Returns the assignment array: position of the cluster center of every point
+        * ``core_ps`` if given is filled at the position of every cluster center with the precision of its cluster
+        * ``unsafe`` if given is filled with whether every point was left as an outlier, without k-anonymity
+        * ``groups`` if given holds the group of every point, groups are clustered as independent datasets
+                - Cells are keyed by ``(group, cell)``, points of different groups never share a cluster
+                - Every level runs once for all the groups, instead of once per group
+                - Clustered as a run per group, but overlaps of the same size may be taken in another order
+                - ``fast_density`` picks the fast levels over the whole run
+        """
+        if self.collapse is None:
+            return self._assign(lats, lons, ids, core_ps, groups, unsafe)
+        min_p, max_p = self.p_bounds
+        keys = [np.asarray(ids)]
+        if self.collapse == "exact":
+            keys += [np.asarray(lats), np.asarray(lons)]
+        else:
+            keys.append(np.array([geo_to_h3(lat, lon, max_p + 1) for lat, lon in zip(lats, lons)], dtype=object))
+        if groups is not None:
+            keys.append(np.asarray(groups))
+        kept, firsts = collapse_duplicates(keys, self.k_anon)
+        sub_core_ps = None if core_ps is None else np.empty(len(kept), dtype=np.int8)
+        sub_mod_indexes = self._assign(
+            lats[kept], lons[kept], np.asarray(ids)[kept], sub_core_ps, None if groups is None else np.asarray(groups)[kept]
+        )
+        if core_ps is not None:
+            # cluster centers are always kept points
+            core_ps[:] = min_p
+            core_ps[kept] = sub_core_ps
+        mod_indexes = expand_assignment(sub_mod_indexes, kept, firsts)
+        outliers = np.isin(mod_indexes, kept[self._outlier_heads])
+        if unsafe is not None:
+            unsafe[:] = outliers
+        self.stats["points"] = len(lats)
+        self.stats["outliers"] = int(outliers.sum())
+        self.stats["collapsed"] = len(lats) - len(kept)
+        return mod_indexes
+
+    def _assign(
+        self,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        ids: np.ndarray,
+        core_ps: Optional[np.ndarray] = None,
+        groups: Optional[np.ndarray] = None,
+        unsafe: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        assert groups is None or self.checkpoint_dir is None, "checkpoints don't support groups"
+        assert groups is None or self.spill_cells is None, "spilled cell tables don't support groups"
+        started = time.perf_counter()
+        mod_indexes = np.arange(len(lats))
         k_anon, (min_p, max_p) = self.k_anon, self.p_bounds
         current_p = max_p + 1
         dot_level = False
+        keys = H3_KEYS if groups is None else GROUP_KEYS
         cells: dict[str, CellStats] = defaultdict(lambda: CellStats(k_anon))
-        # --algorithm--
-        # 1) Fill the cells data structure
-        for i, row in enumerate(anon_locs.itertuples(index=False)):
-            cell = cells[geo_to_h3(row[lat_col_indx], row[lon_col_indx], current_p)]
-            cell[Indxs.FREE].append(i)
-            cell[Ids.FREE].add(row[id_col_indx])
+        checkpoint = LevelCheckpoint(self.checkpoint_dir) if self.checkpoint_dir else None
+        checkpoint_params = self._checkpoint_params(lats, lons, ids) if checkpoint else None
+        self.stats = {"fast_levels": [], "overlap_levels": [], "spilled_levels": [], "points": len(lats)}
+        if self.deadline is not None:
+            deadline = started + self.deadline
+            overlap_cost = seconds_per_cell(k_anon)
+            self.stats.update(degraded_levels=[], skipped_levels=[])
+        # 1) Fill the cells data structure, or take it from the checkpoint
+        if checkpoint and self.resume and (state := checkpoint.load(np.asarray(ids), k_anon, checkpoint_params)):
+            cells, mod_indexes, current_p, dot_level = state
+        elif self.spill_cells is not None:
+            cells, current_p = self._spilled_levels(lats, lons, ids, mod_indexes, current_p)
+        elif self.sort_points:
+            cells = self._sorted_cells(lats, lons, ids, groups, current_p)
+        else:
+            h3_ids = (geo_to_h3(lat, lon, current_p) for lat, lon in zip(lats, lons))
+            cell_keys = h3_ids if groups is None else zip(np.asarray(groups).tolist(), h3_ids)
+            for i, (cell_key, id_) in enumerate(zip(cell_keys, ids)):
+                cell = cells[cell_key]
+                cell[Indxs.FREE].append(i)
+                cell[Ids.FREE].add(id_)
+        self.stats.setdefault("cells", len(cells))
         # 2) Group elements lowering the precision each iteration
         while current_p > min_p:
-            # 2.1 -> Analyze overlapping situations and build groups
-            flower_overlaps: dict[str, SortedList[str]] = defaultdict(SortedList)
-            for h3_id in cells.keys():
-                for flower_cell_id in k_ring(h3_id, 1):
-                    flower_overlaps[flower_cell_id].add(h3_id)
-            for overlap in SortedSet(((*o,) for o in flower_overlaps.values() if len(o) > 1), key=len):
-                # utility data structures
-                most_free_indxs = max(overlap, key=lambda h3_id: len(cells[h3_id][Indxs.FREE]))
-                combined = reduce(lambda curr, h3_id: curr.combine(cells[h3_id]), overlap, CellStats(k_anon))
-                # cluster if possible
-                core = None
-                if len(combined[(Indxs if dot_level else Ids).FREE]) >= k_anon:
-                    # create core with free's
-                    chosen_cell = cells[most_free_indxs]
-                    core = (chosen_cell[Indxs.FREE][0], current_p - 1, most_free_indxs)
-                    chosen_cell[Indxs.CORE].append(core)
-                elif combined[Indxs.FREE] and combined[Indxs.CORE]:
-                    # attach free's to existing core
-                    highst_core_p = max(combined[Indxs.CORE], key=lambda c: c[1])[1] + 1
-                    core = min(combined[Indxs.CORE], key=lambda c: safe_dist(most_free_indxs, c[2], highst_core_p))
-                if core is not None:
-                    core_indx, *_ = core
-                    mod_indexes[combined[Indxs.FREE]] = core_indx
-                    for flower_center_id in overlap:
-                        for opt in (Indxs, Ids):
-                            cells[flower_center_id][opt.FREE].clear()
+            # 2.1 -> Build groups, cell by cell in fast levels or analyzing overlapping situations
+            level_started = time.perf_counter()
+            fast_level = self._is_fast_level(cells, current_p)
+            if self.deadline is not None:
+                if level_started >= deadline:
+                    # no time left, a single pass groups the free points in their cells of min_p
+                    self.stats["skipped_levels"] = list(range(current_p, min_p, -1)) + [min_p + 1] * (not dot_level)
+                    current_p = min_p
+                    parent_cells = defaultdict(lambda: CellStats(k_anon))
+                    for h3_id, cell_stats in cells.items():
+                        parent_cells[keys.parent(h3_id, current_p)].combine(cell_stats)
+                    cells = parent_cells
+                    self._group_cells(cells, mod_indexes, current_p, False)
+                    break
+                if not fast_level and level_started + overlap_cost * len(cells) > deadline:
+                    fast_level = True
+                    self.stats["degraded_levels"].append(current_p)
+            if fast_level:
+                self._group_cells(cells, mod_indexes, current_p, dot_level)
+                self.stats["fast_levels"].append(current_p)
+            else:
+                self._group_overlaps(cells, mod_indexes, current_p, dot_level, keys)
+                self.stats["overlap_levels"].append(current_p)
+                overlap_cost = (time.perf_counter() - level_started) / max(len(cells), 1)
             # 2.2 -> Reduce precision and break if not more indexes
             if current_p == min_p + 1 and not dot_level:
                 dot_level = True
             else:
                 current_p -= 1
-                free_indxs = False
-                parent_cells = defaultdict(lambda: CellStats(k_anon))
-                for h3_id, cell_stats in cells.items():
-                    free_indxs = free_indxs or cell_stats[Indxs.FREE]
-                    parent_cells[h3_to_parent(h3_id, current_p)].combine(cell_stats)
-                if not free_indxs:
-                    break
-                cells = parent_cells
+                if self.sort_points:
+                    if not any(cell_stats[Indxs.FREE] for cell_stats in cells.values()):
+                        break
+                    cells = self._merge_runs(cells, current_p, keys)
+                else:
+                    free_indxs = False
+                    parent_cells = defaultdict(lambda: CellStats(k_anon))
+                    for h3_id, cell_stats in cells.items():
+                        free_indxs = free_indxs or cell_stats[Indxs.FREE]
+                        parent_cells[keys.parent(h3_id, current_p)].combine(cell_stats)
+                    if not free_indxs:
+                        break
+                    cells = parent_cells
+            if checkpoint:
+                checkpoint.save(cells, mod_indexes, current_p, dot_level, checkpoint_params)
         # 3º) Add the outliers to the result
         for outliers_grp in (outs for s in cells.values() if (outs := s[Indxs.FREE])):
             mod_indexes[outliers_grp] = outliers_grp[0]
-        # appy mods to the dataframe
-        anon_locs.iloc[:, critical_cols_indxs] = anon_locs.iloc[mod_indexes, critical_cols_indxs].reset_index(drop=True)
-        return anon_locs
+        self.stats["cores"] = sum(len(cell[Indxs.CORE]) for cell in cells.values())
+        self.stats["outliers"] = sum(len(cell[Indxs.FREE]) for cell in cells.values())
+        self._outlier_heads = [outs[0] for cell in cells.values() if (outs := cell[Indxs.FREE])]
+        if unsafe is not None:
+            unsafe[:] = False
+            for outliers_grp in (outs for s in cells.values() if (outs := s[Indxs.FREE])):
+                unsafe[outliers_grp] = True
+        if core_ps is not None:
+            # cores of every level are kept in the core table of their ancestors
+            core_ps[:] = min_p
+            for cell in cells.values():
+                for core_indx, core_p, *_ in cell[Indxs.CORE]:
+                    core_ps[core_indx] = core_p
+                if outs := cell[Indxs.FREE]:
+                    core_ps[outs[0]] = current_p
+        if checkpoint:
+            checkpoint.clear()
+        return mod_indexes
 
-    def apply_one_col(self, locs: pd.DataFrame, id_col: str, latlon_col: str, *critical_cols: str) -> pd.DataFrame:
-        # --asserts and prepare data structures--
-        anon_locs = locs.copy()
-        mod_indexes = np.arange(len(anon_locs))
-        id_col_indx, latlon_col_indx = [anon_locs.columns.get_loc(c) for c in (id_col, latlon_col)]
-        critical_cols_indxs = list({anon_locs.columns.get_loc(c) for c in critical_cols} | {latlon_col_indx})
-        k_anon, (min_p, max_p) = self.k_anon, self.p_bounds
-        current_p = max_p + 1
-        dot_level = False
-        cells: dict[str, CellStats] = defaultdict(lambda: CellStats(k_anon))
-        # --algorithm--
-        # 1) Fill the cells data structure
-        for i, row in enumerate(anon_locs.itertuples(index=False)):
-            latlon = row[latlon_col_indx]
-            if type(latlon) == str:
-                latlon = latlon.strip().split(",")
-            lat, lon = map(float, latlon)
+    def _checkpoint_params(self, lats: np.ndarray, lons: np.ndarray, ids: np.ndarray) -> list:
+        """
+        * Parameters a checkpoint is saved with, a run only resumes from a checkpoint with the same ones
+                - The parameters of the engine and the options changing its result
+                - A ``blake2b`` fingerprint of the positions and ids of the points
+        """
+        fingerprint = hashlib.blake2b(digest_size=16)
+        fingerprint.update(np.ascontiguousarray(lats, dtype=np.float64).tobytes())
+        fingerprint.update(np.ascontiguousarray(lons, dtype=np.float64).tobytes())
+        fingerprint.update(pd.util.hash_array(np.asarray(ids)).tobytes())
+        options = {
+            "fast_p": self.fast_p,
+            "fast_density": self.fast_density,
+            "collapse": self.collapse,
+            "sort_points": self.sort_points,
+            "spill_cells": self.spill_cells,
+            "deadline": self.deadline,
+        }
+        min_p, max_p = self.p_bounds
+        return [self.k_anon, min_p, max_p, len(lats), fingerprint.hexdigest(), options]
 
-            cell = cells[geo_to_h3(lat, lon, current_p)]
-            cell[Indxs.FREE].append(i)
-            cell[Ids.FREE].add(row[id_col_indx])
-        # 2) Group elements lowering the precision each iteration
-        while current_p > min_p:
-            # 2.1 -> Analyze overlapping situations and build groups
+    def _sorted_cells(
+        self, lats: np.ndarray, lons: np.ndarray, ids: np.ndarray, groups: Optional[np.ndarray], current_p: int
+    ) -> Dict[str, CellStats]:
+        """
+        * Fills the cell table of ``current_p`` from the points sorted by cell (stable, by group first)
+                - The points of a cell are a contiguous range of the order, every cell is built at once
+                - Points keep their positions, the order is only used to fill the table
+                - Cells are added in H3 order, the children of a parent next to each other
+        """
+        k_anon = self.k_anon
+        h3_ints = np.fromiter(
+            (string_to_h3(geo_to_h3(lat, lon, current_p)) for lat, lon in zip(lats, lons)), dtype=np.uint64, count=len(lats)
+        )
+        order = np.argsort(h3_ints, kind="stable") if groups is None else np.lexsort((h3_ints, groups))
+        sorted_ints = h3_ints[order]
+        changes = sorted_ints[1:] != sorted_ints[:-1]
+        if groups is not None:
+            sorted_groups = np.asarray(groups)[order]
+            changes |= sorted_groups[1:] != sorted_groups[:-1]
+        starts = np.flatnonzero(np.r_[True, changes]) if len(order) else np.empty(0, dtype=np.int64)
+        ends = np.r_[starts[1:], len(order)]
+        ids = np.asarray(ids)
+        cells: Dict[str, CellStats] = defaultdict(lambda: CellStats(k_anon))
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            h3_id = h3_to_string(int(sorted_ints[start]))
+            cell = cells[h3_id if groups is None else (sorted_groups[start].item(), h3_id)]
+            cell_indxs = order[start:end]
+            cell[Indxs.FREE].extend(cell_indxs.tolist())
+            cell[Ids.FREE].update(ids[cell_indxs].tolist())
+        return cells
+
+    def _merge_runs(self, cells: Dict[str, CellStats], current_p: int, keys: CellKeys = H3_KEYS) -> Dict[str, CellStats]:
+        """
+        * Builds the cell table of ``current_p`` from a table in H3 order, see ``_sorted_cells``
+                - The children of a parent are a run of the table, merged into its first child
+                - The parents are in H3 order too
+                - Children out of their run (a table resumed from a checkpoint) are merged into their parent
+        """
+        k_anon = self.k_anon
+        parent_cells: Dict[str, CellStats] = defaultdict(lambda: CellStats(k_anon))
+        run_id, run_cell = None, None
+        for h3_id, cell_stats in cells.items():
+            parent_id = keys.parent(h3_id, current_p)
+            if parent_id == run_id:
+                run_cell.combine(cell_stats)
+            elif parent_id in parent_cells:
+                run_id, run_cell = parent_id, parent_cells[parent_id].combine(cell_stats)
+            else:
+                run_id, run_cell = parent_id, cell_stats
+                parent_cells[parent_id] = cell_stats
+        return parent_cells
+
+    def _spilled_levels(
+        self, lats: np.ndarray, lons: np.ndarray, ids: np.ndarray, mod_indexes: np.ndarray, current_p: int
+    ) -> Tuple[Dict[str, CellStats], int]:
+        """
+        * Groups on disk the levels with more than ``spill_cells`` cells
+        * Returns the in-memory cell table and the precision of the first level left to group
+        """
+        min_p, _ = self.p_bounds
+        ids = np.asarray(ids)
+        id_codes, _ = pd.factorize(ids)
+        spilled = SpilledCells(self.k_anon, self.spill_dir)
+        try:
+            spilled.fill(
+                np.fromiter(
+                    (string_to_h3(geo_to_h3(lat, lon, current_p)) for lat, lon in zip(lats, lons)),
+                    dtype=np.uint64,
+                    count=len(lats),
+                ),
+                id_codes,
+            )
+            self.stats["cells"] = spilled.n_cells
+            while spilled.rows and spilled.n_cells > self.spill_cells and current_p > min_p + 2:
+                spilled.group_level(mod_indexes, current_p)
+                self.stats["spilled_levels"].append(current_p)
+                current_p -= 1
+            return spilled.to_cells(ids), current_p
+        finally:
+            spilled.close()
+
+    def _is_fast_level(self, cells: Dict[str, CellStats], current_p: int) -> bool:
+        """
+        * Fast levels are the ones at ``fast_p`` or finer, or with ``fast_density`` free points per cell or more
+        """
+        if self.fast_p is not None and current_p >= self.fast_p:
+            return True
+        if self.fast_density is not None:
+            free_cells = sum(1 for cell in cells.values() if cell[Indxs.FREE])
+            free_indxs = sum(len(cell[Indxs.FREE]) for cell in cells.values())
+            return free_cells > 0 and free_indxs / free_cells >= self.fast_density
+        return False
+
+    def _group_cells(self, cells: Dict[str, CellStats], mod_indexes: np.ndarray, current_p: int, dot_level: bool) -> None:
+        """
+        * Classic grouping, like ``UberH3Classic``: groups are built with the free points of a single cell
+        """
+        k_anon = self.k_anon
+        for h3_id, cell in cells.items():
+            core = None
+            if len(cell[(Indxs if dot_level else Ids).FREE]) >= k_anon:
+                # create core with free's
+                core = (cell[Indxs.FREE][0], current_p, h3_id)
+                cell[Indxs.CORE].append(core)
+            elif cell[Indxs.FREE] and cell[Indxs.CORE]:
+                # attach free's to a core of the cell
+                core = cell[Indxs.CORE][0]
+            if core is not None:
+                core_indx, *_ = core
+                mod_indexes[cell[Indxs.FREE]] = core_indx
+                for opt in (Indxs, Ids):
+                    cell[opt.FREE].clear()
+
+    def _coarse_cells(self) -> Optional[CoarseCells]:
+        """
+        * Lookup table of the coarse cells, opened once per process, ``None`` if not used
+        """
+        if self.coarse_res is None:
+            return None
+        return open_table(self.coarse_table, self.coarse_res)
+
+    def _group_overlaps(
+        self, cells: Dict[str, CellStats], mod_indexes: np.ndarray, current_p: int, dot_level: bool, keys: CellKeys = H3_KEYS
+    ) -> None:
+        """
+        * Hexanonimity grouping: groups are built with the free points of the cells overlapping in the same flower
+        """
+        k_anon = self.k_anon
+        coarse_cells = self._coarse_cells()
+        if coarse_cells is not None and keys is H3_KEYS and current_p <= min(self.coarse_res, coarse_cells.max_res):
+            overlaps = coarse_cells.flower_overlaps(list(cells.keys()), current_p)
+        else:
             flower_overlaps: dict[str, SortedList[str]] = defaultdict(SortedList)
             for h3_id in cells.keys():
-                for flower_cell_id in k_ring(h3_id, 1):
+                for flower_cell_id in keys.ring(h3_id):
                     flower_overlaps[flower_cell_id].add(h3_id)
-            for overlap in SortedSet(((*o,) for o in flower_overlaps.values() if len(o) > 1), key=len):
-                # utility data structures
-                most_free_indxs = max(overlap, key=lambda h3_id: len(cells[h3_id][Indxs.FREE]))
-                combined = reduce(lambda curr, h3_id: curr.combine(cells[h3_id]), overlap, CellStats(k_anon))
-                # cluster if possible
-                core = None
-                if len(combined[(Indxs if dot_level else Ids).FREE]) >= k_anon:
-                    # create core with free's
-                    chosen_cell = cells[most_free_indxs]
-                    core = (chosen_cell[Indxs.FREE][0], current_p - 1, most_free_indxs)
-                    chosen_cell[Indxs.CORE].append(core)
-                elif combined[Indxs.FREE] and combined[Indxs.CORE]:
-                    # attach free's to existing core
-                    highst_core_p = max(combined[Indxs.CORE], key=lambda c: c[1])[1] + 1
-                    core = min(combined[Indxs.CORE], key=lambda c: safe_dist(most_free_indxs, c[2], highst_core_p))
-                if core is not None:
-                    core_indx, *_ = core
-                    mod_indexes[combined[Indxs.FREE]] = core_indx
-                    for flower_center_id in overlap:
-                        for opt in (Indxs, Ids):
-                            cells[flower_center_id][opt.FREE].clear()
-            # 2.2 -> Reduce precision and break if not more indexes
-            if current_p == min_p + 1 and not dot_level:
-                dot_level = True
-            else:
-                current_p -= 1
-                free_indxs = False
-                parent_cells = defaultdict(lambda: CellStats(k_anon))
-                for h3_id, cell_stats in cells.items():
-                    free_indxs = free_indxs or cell_stats[Indxs.FREE]
-                    parent_cells[h3_to_parent(h3_id, current_p)].combine(cell_stats)
-                if not free_indxs:
-                    break
-                cells = parent_cells
-        # 3º) Add the outliers to the result
-        for outliers_grp in (outs for s in cells.values() if (outs := s[Indxs.FREE])):
-            mod_indexes[outliers_grp] = outliers_grp[0]
-        # appy mods to the dataframe
-        anon_locs.iloc[:, critical_cols_indxs] = anon_locs.iloc[mod_indexes, critical_cols_indxs].reset_index(drop=True)
-        return anon_locs
+            overlaps = flower_overlaps.values()
+        for overlap in SortedSet(((*o,) for o in overlaps if len(o) > 1), key=len):
+            # utility data structures
+            most_free_indxs = max(overlap, key=lambda h3_id: len(cells[h3_id][Indxs.FREE]))
+            combined = reduce(lambda curr, h3_id: curr.combine(cells[h3_id]), overlap, CellStats(k_anon))
+            # cluster if possible
+            core = None
+            if len(combined[(Indxs if dot_level else Ids).FREE]) >= k_anon:
+                # create core with free's
+                chosen_cell = cells[most_free_indxs]
+                core = (chosen_cell[Indxs.FREE][0], current_p - 1, most_free_indxs)
+                chosen_cell[Indxs.CORE].append(core)
+            elif combined[Indxs.FREE] and combined[Indxs.CORE]:
+                # attach free's to existing core
+                highst_core_p = max(combined[Indxs.CORE], key=lambda c: c[1])[1] + 1
+                core = min(
+                    combined[Indxs.CORE], key=lambda c: safe_dist(keys.h3(most_free_indxs), keys.h3(c[2]), highst_core_p)
+                )
+            if core is not None:
+                core_indx, *_ = core
+                mod_indexes[combined[Indxs.FREE]] = core_indx
+                for flower_center_id in overlap:
+                    for opt in (Indxs, Ids):
+                        cells[flower_center_id][opt.FREE].clear()
 
     def apply_debug(self, locs: pd.DataFrame, id_col: str, lat_col: str, lon_col: str, time_col: str) -> pd.DataFrame:
         # --asserts and prepare data structures--
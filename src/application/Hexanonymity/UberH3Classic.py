@@ -1,9 +1,9 @@
 from collections import defaultdict
-from typing import Dict
+from typing import Dict, Optional
 import pandas as pd
 import numpy as np
 from h3 import geo_to_h3, h3_to_parent
-from src.application.Hexanonymity.CellStats import CellStats
+from src.application.Hexanonymity.CellStats import CellStats, Ids, Indxs
 from src.application.Hexanonymity.H3Anonimyzer import H3Anonimyzer
 
 class UberH3Classic(H3Anonimyzer):
@@ -14,10 +14,12 @@ class UberH3Classic(H3Anonimyzer):
             - Build groups from ``max_p`` to ``min_p`` with id_level protection
             - Build groups with ``min_p`` with loc_level protection
             - Group remaining locations in the same cell of ``min_p``
+    * ``stats`` reports the ``points``, ``cells``, ``cores`` and ``outliers`` of the last run, see ``assign``
     """
 
     def __init__(self, k_anon: int, max_p: int = 14, min_p: int = 0):
         super().__init__(k_anon, max_p, min_p)
+        self.stats = {}
 
     def __str__(self) -> str:
         return "UberH3Classic-" + super().__str__()
@@ -27,34 +29,54 @@ class UberH3Classic(H3Anonimyzer):
 
     def apply(self, locs: pd.DataFrame, id_col: str, lat_col: str, lon_col: str, *critical_cols: str) -> pd.DataFrame:
         # --asserts and prepare data structures--
-        anon_locs = locs.copy()
-        mod_indexes = np.arange(len(anon_locs))
-        id_col_indx, lat_col_indx, lon_col_indx = [anon_locs.columns.get_loc(c) for c in (id_col, lat_col, lon_col)]
-        critical_cols_indxs = list({anon_locs.columns.get_loc(c) for c in critical_cols} | {lat_col_indx, lon_col_indx})
+        id_col_indx, lat_col_indx, lon_col_indx = [locs.columns.get_loc(c) for c in (id_col, lat_col, lon_col)]
+        critical_cols_indxs = list({locs.columns.get_loc(c) for c in critical_cols} | {lat_col_indx, lon_col_indx})
+        # --algorithm--
+        mod_indexes = self.assign(
+            locs.iloc[:, lat_col_indx].to_numpy(), locs.iloc[:, lon_col_indx].to_numpy(), locs.iloc[:, id_col_indx].to_numpy()
+        )
+        # appy mods to the dataframe
+        return self.assemble(locs, mod_indexes, critical_cols_indxs)
+
+    def assign(
+        self,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        ids: np.ndarray,
+        core_ps: Optional[np.ndarray] = None,
+        unsafe: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        * Same as ``StrictIdHexAnon.assign``, without groups
+        """
+        mod_indexes = np.arange(len(lats))
         k_anon, (min_p, max_p) = self.k_anon, self.p_bounds
         current_p = max_p + 1
         dot_level = False
         cells: Dict[str, CellStats] = defaultdict(lambda: CellStats(k_anon))
-        # --algorithm--
+        self.stats = {"points": len(lats)}
         # 1) Fill the cells data structure
-        for i, row in enumerate(anon_locs.itertuples(index=False)):
-            cell = cells[geo_to_h3(row[lat_col_indx], row[lon_col_indx], current_p)]
-            cell.free_indxs.append(i)
-            cell.free_ids.add(row[id_col_indx])
+        for i, (lat, lon, id_) in enumerate(zip(lats, lons, ids)):
+            cell = cells[geo_to_h3(lat, lon, current_p)]
+            cell[Indxs.FREE].append(i)
+            cell[Ids.FREE].add(id_)
+        self.stats["cells"] = len(cells)
         # 2) Group elements lowering the precision each iteration
         while current_p > min_p:
-            for cell in cells.values():
+            for h3_id, cell in cells.items():
                 core = None
-                if len(cell.free_indxs if dot_level else cell.free_ids) >= k_anon:
+                if len(cell[(Indxs if dot_level else Ids).FREE]) >= k_anon:
                     # group can be built with all new members
-                    core = cell.free_indxs[0]
-                    cell.core_data.append(core)
-                elif cell.free_indxs and cell.core_data:
+                    core = (cell[Indxs.FREE][0], current_p, h3_id)
+                    cell[Indxs.CORE].append(core)
+                elif cell[Indxs.FREE] and cell[Indxs.CORE]:
                     # group can be built by attaching to one previously built
-                    core = cell.core_data[0]
+                    core = cell[Indxs.CORE][0]
                 if core is not None:
-                    mod_indexes[cell.free_indxs] = core
-                    cell.clear_free()
+                    core_indx, *_ = core
+                    mod_indexes[cell[Indxs.FREE]] = core_indx
+                    for opt in (Indxs, Ids):
+                        cell[opt.FREE].clear()
             if current_p == min_p and not dot_level:
                 dot_level = True
             else:
@@ -62,16 +84,28 @@ class UberH3Classic(H3Anonimyzer):
                 free_indxs = False
                 parent_cells = defaultdict(lambda: CellStats(k_anon))
                 for h3_id, cell_stats in cells.items():
-                    free_indxs = free_indxs or cell_stats.free_indxs
+                    free_indxs = free_indxs or cell_stats[Indxs.FREE]
                     parent_cells[h3_to_parent(h3_id, current_p)].combine(cell_stats)
                 if not free_indxs:
                     break
                 cells = parent_cells
         # 3º) Add the outliers to the result
-        for outliers_grp in (outs for s in cells.values() if (outs := s.free_indxs)):
+        for outliers_grp in (outs for s in cells.values() if (outs := s[Indxs.FREE])):
             mod_indexes[outliers_grp] = outliers_grp[0]
-        # appy mods to the dataframe
-        anon_locs.iloc[:, critical_cols_indxs] = anon_locs.iloc[mod_indexes, critical_cols_indxs].reset_index(drop=True)
+        self.stats["cores"] = sum(len(cell[Indxs.CORE]) for cell in cells.values())
+        self.stats["outliers"] = sum(len(cell[Indxs.FREE]) for cell in cells.values())
+        if unsafe is not None:
+            unsafe[:] = False
+            for outliers_grp in (outs for s in cells.values() if (outs := s[Indxs.FREE])):
+                unsafe[outliers_grp] = True
+        if core_ps is not None:
+            core_ps[:] = min_p
+            for cell in cells.values():
+                for core_indx, core_p, *_ in cell[Indxs.CORE]:
+                    core_ps[core_indx] = core_p
+                if outs := cell[Indxs.FREE]:
+                    core_ps[outs[0]] = current_p
+        return mod_indexes
 
     def apply_debug(self, locs: pd.DataFrame, id_col: str, lat_col: str, lon_col: str, time_col: str) -> pd.DataFrame:
         # --asserts and prepare data structures--
@@ -94,29 +128,30 @@ class UberH3Classic(H3Anonimyzer):
         # 1) Fill the cells data structure
         for i, row in enumerate(anon_locs.itertuples(index=False)):
             cell = cells[geo_to_h3(row[col("lat1")], row[col("lon1")], current_p)]
-            cell.free_indxs.append(i)
-            cell.free_ids.add(row[col("id")])
+            cell[Indxs.FREE].append(i)
+            cell[Ids.FREE].add(row[col("id")])
         # 2) Group elements lowering the precision each iteration
         while current_p >= min_p:
             for cell in cells.values():
-                if outliers and (outs := cell.free_indxs):
+                if outliers and (outs := cell[Indxs.FREE]):
                     mod_loc_indxs[outs] = outs[0]
                     prec_vals[outs] = (current_p, current_p)
                     safe_vals[outs] = (0, 0, 1)
                 else:
                     core = None
-                    if len(cell.free_indxs if dot_level else cell.free_ids) >= k_anon:
+                    if len(cell[(Indxs if dot_level else Ids).FREE]) >= k_anon:
                         # group can be built with all new members
-                        core: CellStats.CoreData = (cell.free_indxs[0], current_p, dot_level)
-                        cell.core_data.append(core)
-                    elif cell.free_indxs and cell.core_data:
-                        core = cell.core_data[0]
+                        core = (cell[Indxs.FREE][0], current_p, dot_level)
+                        cell[Indxs.CORE].append(core)
+                    elif cell[Indxs.FREE] and cell[Indxs.CORE]:
+                        core = cell[Indxs.CORE][0]
                     if core is not None:
                         core_indx, core_p, core_dot_level = core
-                        mod_loc_indxs[cell.free_indxs] = core_indx
-                        prec_vals[cell.free_indxs] = (core_p, current_p)
-                        safe_vals[cell.free_indxs] = (0, 1, 0) if core_dot_level else (1, 0, 0)
-                        cell.clear_free()
+                        mod_loc_indxs[cell[Indxs.FREE]] = core_indx
+                        prec_vals[cell[Indxs.FREE]] = (core_p, current_p)
+                        safe_vals[cell[Indxs.FREE]] = (0, 1, 0) if core_dot_level else (1, 0, 0)
+                        for opt in (Indxs, Ids):
+                            cell[opt.FREE].clear()
             if current_p == min_p and not dot_level:
                 dot_level = True
             elif current_p == min_p and dot_level and not outliers:
@@ -126,7 +161,7 @@ class UberH3Classic(H3Anonimyzer):
                 free_indxs = False
                 parent_cells: dict[str, CellStats] = defaultdict(lambda: CellStats(k_anon))
                 for h3_id, cell_stats in cells.items():
-                    free_indxs = free_indxs or cell_stats.free_indxs
+                    free_indxs = free_indxs or cell_stats[Indxs.FREE]
                     parent_cells[h3_to_parent(h3_id, current_p)].combine(cell_stats)
                 if not free_indxs:
                     break
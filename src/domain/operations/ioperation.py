@@ -1,6 +1,10 @@
+from __future__ import annotations
 from abc import abstractmethod
-from src.domain.operations.operation_configuration import OperationConfiguration
-from pandas import DataFrame
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.domain.operations.operation_configuration import OperationConfiguration
+    from pandas import DataFrame
 
 class IOperation:
     @property
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from src.domain.operations.i_multifield_operation import IMultifieldOperation
+from src.domain.operations.ioperation import IOperation
+
+
+class ResultCache:
+    """
+    * Opt-in cache of the results of an ``IOperation``, see the ``cache`` argument of ``Hexanonimity``
+    * Keyed by the configuration of the operation plus a fingerprint of the columns it reads:
+            - The configuration is hashed from ``OperationConfiguration.json()`` with SHA-256, stable between processes
+            - The columns are the ones of ``get_multifield`` (all of them for other operations),
+              hashed row by row with ``pandas.util.hash_pandas_object`` and then with BLAKE2
+    * Stores dicts of numpy arrays (assignment arrays, not whole frames):
+            - In memory, evicting the least recently used entry beyond ``max_entries``
+            - Also in ``directory`` as ``.npz`` files if given, read back on a memory miss and never evicted
+    * Thread safe, ``hits`` and ``misses`` count the lookups
+    """
+
+    def __init__(self, max_entries: int = 128, directory: Optional[str] = None):
+        assert max_entries >= 1
+        self.max_entries = max_entries
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(operation: IOperation, data: pd.DataFrame) -> str:
+        columns: List[str] = list(data.columns)
+        if isinstance(operation, IMultifieldOperation):
+            columns = [c for c in dict.fromkeys(operation.get_multifield()) if c in data.columns]
+        fingerprint = hashlib.blake2b(digest_size=16)
+        fingerprint.update(json.dumps([len(data), columns, [str(data[c].dtype) for c in columns]]).encode())
+        if len(data):
+            fingerprint.update(pd.util.hash_pandas_object(data[columns], index=False).to_numpy().tobytes())
+        configuration = hashlib.sha256(operation.configuration.json().encode()).hexdigest()[:32]
+        return f"{configuration}-{fingerprint.hexdigest()}"
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.directory is not None:
+            try:
+                with np.load(self._path(key)) as stored:
+                    entry = {name: stored[name] for name in stored.files}
+                self._remember(key, entry)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, key: str, arrays: Dict[str, np.ndarray]) -> None:
+        self._remember(key, arrays)
+        if self.directory is not None:
+            # written aside and renamed, readers never see a partial file
+            tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp.npz"
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, self._path(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, arrays: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            self._entries[key] = arrays
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from h3 import geo_to_h3, h3_to_parent, string_to_h3
+from src.application.Hexanonymity.H3Anonimyzer import split_latlon
+from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+
+_CELL, _ROW, _INDEX = "__h3_cell", "__row", "__index"
+
+
+def _coarse_cells(part: pd.DataFrame, latlon_col: str, partition_p: int) -> pd.DataFrame:
+    lats, lons = split_latlon(part[latlon_col].to_numpy())
+    cells = [string_to_h3(h3_to_parent(geo_to_h3(lat, lon, 15), partition_p)) for lat, lon in zip(lats, lons)]
+    return part.assign(**{_CELL: np.array(cells, dtype=np.uint64)})
+
+
+def _anonymize_partition(part: pd.DataFrame, operation: Hexanonimity) -> pd.DataFrame:
+    return operation.apply(part.drop(columns=_CELL).reset_index(drop=True)).set_index(part.index)
+
+
+def _restore_index(part: pd.DataFrame, index_name) -> pd.DataFrame:
+    return part.set_index(_INDEX).rename_axis(index_name)
+
+
+def anonymize_dask(ddf, operation: Hexanonimity, partition_p: int = 0, npartitions: int = None):
+    """
+    * Anonymizes a ``dask.dataframe.DataFrame`` with a ``Hexanonimity`` operation without collecting it to one node
+    * Follows this stages:
+            - Rows are shuffled by their H3 ancestor at ``partition_p``, a cell is never split between partitions
+            - Every partition is anonymized on its own by the workers of the current scheduler
+            - Rows are sent back to their original partition and order, with their original index and divisions
+    * Clusters never cross partitions, results may differ from a single run near the borders of the ``partition_p`` cells
+    * Needs ``dask[dataframe]``, any scheduler works (local threads/processes or a ``distributed`` cluster)
+    """
+    latlon_col = operation.fields[0]
+    index_name, divisions = ddf.index.name, ddf.divisions
+    lengths = ddf.map_partitions(len).compute()
+    row_divisions = (0, *np.cumsum(lengths)[:-1].tolist(), int(np.sum(lengths)) - 1) if len(lengths) else (None, None)
+    # global row number of every row, to put it back in place
+    ddf = ddf.reset_index().rename(columns={"index" if index_name is None else index_name: _INDEX})
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    ddf = ddf.map_partitions(
+        lambda part, partition_info=None: part.assign(**{_ROW: np.arange(len(part)) + offsets[partition_info["number"]]}),
+        meta=ddf._meta.assign(**{_ROW: np.int64(0)}),
+    )
+    with_cells = ddf.map_partitions(_coarse_cells, latlon_col, partition_p, meta=ddf._meta.assign(**{_CELL: np.uint64(0)}))
+    spatial = with_cells.shuffle(_CELL, npartitions=npartitions or ddf.npartitions, shuffle="tasks")
+    anonymized = spatial.map_partitions(_anonymize_partition, operation, meta=operation.apply(ddf._meta.copy()))
+    in_place = anonymized.set_index(_ROW, divisions=row_divisions, shuffle="tasks")
+    restored = in_place.map_partitions(_restore_index, index_name, meta=_restore_index(in_place._meta, index_name))
+    restored.divisions = divisions
+    return restored
@@ -0,0 +1,150 @@
+import bisect
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class AnonymizationMetrics:
+    """
+    * Metrics of the anonymization runs of a long-running worker, fed by ``Hexanonimity`` with its ``metrics`` argument
+    * Per ``apply`` call: latency histogram, rows, cores created, outliers and size of the largest cell table
+    * Lock-free on the hot path: ``record`` only appends a tuple to a ``deque``, atomic in CPython
+            - Events are folded into the totals when read (``snapshot``, ``prometheus``)
+            - Or every ``fold_every`` events by the recording thread, if no other thread is folding already
+    * Read programmatically with ``snapshot`` or scraped in Prometheus text format, see ``serve``
+    """
+
+    def __init__(self, namespace: str = "hexanonymity", buckets: Tuple[float, ...] = LATENCY_BUCKETS, fold_every: int = 10_000):
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self.fold_every = fold_every
+        self._events: deque = deque()
+        self._fold_lock = threading.Lock()
+        self._bucket_counts = [0] * (len(self.buckets) + 1)
+        self._totals = {"calls": 0, "seconds": 0.0, "points": 0, "cores": 0, "outliers": 0}
+        self._last_cells = 0
+        self._max_cells = 0
+        self._started = time.monotonic()
+
+    def record(self, seconds: float, stats: Dict[str, int]) -> None:
+        """
+        * Records an ``apply`` call that took ``seconds``, with the ``stats`` of its engine run
+        """
+        self._events.append(
+            (seconds, stats.get("points", 0), stats.get("cores", 0), stats.get("outliers", 0), stats.get("cells", 0))
+        )
+        if len(self._events) >= self.fold_every and self._fold_lock.acquire(blocking=False):
+            try:
+                self._fold()
+            finally:
+                self._fold_lock.release()
+
+    def _fold(self) -> None:
+        totals, events = self._totals, self._events
+        while events:
+            seconds, points, cores, outliers, cells = events.popleft()
+            self._bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            totals["points"] += points
+            totals["cores"] += cores
+            totals["outliers"] += outliers
+            self._last_cells = cells
+            self._max_cells = max(self._max_cells, cells)
+
+    def snapshot(self) -> dict:
+        """
+        * Returns the current values of every metric
+                - ``latency_buckets`` -> cumulative count of calls up to every bucket bound, the last one is ``+Inf``
+                - ``points_per_second`` -> points over the time spent in ``apply``
+                - ``outlier_share`` -> share of points left as outliers (unsafe)
+                - ``max_rss_bytes`` -> peak resident memory of the process, ``None`` where not available
+        """
+        with self._fold_lock:
+            self._fold()
+            totals = dict(self._totals)
+            bucket_counts = list(self._bucket_counts)
+            last_cells, max_cells = self._last_cells, self._max_cells
+        cumulative = [sum(bucket_counts[: i + 1]) for i in range(len(bucket_counts))]
+        return {
+            **totals,
+            "latency_buckets": dict(zip((*self.buckets, float("inf")), cumulative)),
+            "points_per_second": totals["points"] / totals["seconds"] if totals["seconds"] else 0.0,
+            "outlier_share": totals["outliers"] / totals["points"] if totals["points"] else 0.0,
+            "cells": last_cells,
+            "max_cells": max_cells,
+            "max_rss_bytes": _max_rss_bytes(),
+            "uptime_seconds": time.monotonic() - self._started,
+        }
+
+    def prometheus(self) -> str:
+        """
+        * Returns the metrics in the Prometheus text exposition format
+        """
+        values, ns = self.snapshot(), self.namespace
+        lines = [
+            f"# HELP {ns}_apply_seconds Latency of the anonymization calls.",
+            f"# TYPE {ns}_apply_seconds histogram",
+        ]
+        for bound, count in values["latency_buckets"].items():
+            lines.append(f'{ns}_apply_seconds_bucket{{le="{"+Inf" if bound == float("inf") else bound}"}} {count}')
+        lines += [f"{ns}_apply_seconds_sum {values['seconds']}", f"{ns}_apply_seconds_count {values['calls']}"]
+        counters = {
+            "points_total": ("Points anonymized.", values["points"]),
+            "cores_total": ("Cluster cores created.", values["cores"]),
+            "outliers_total": ("Points left as outliers (unsafe).", values["outliers"]),
+        }
+        gauges = {
+            "points_per_second": ("Points anonymized per second spent in apply.", values["points_per_second"]),
+            "outlier_share": ("Share of points left as outliers.", values["outlier_share"]),
+            "cells": ("Largest cell table of the last call.", values["cells"]),
+            "max_cells": ("Largest cell table of every call.", values["max_cells"]),
+        }
+        if values["max_rss_bytes"] is not None:
+            gauges["max_rss_bytes"] = ("Peak resident memory of the process.", values["max_rss_bytes"])
+        for kind, metrics in (("counter", counters), ("gauge", gauges)):
+            for name, (help_text, value) in metrics.items():
+                lines += [f"# HELP {ns}_{name} {help_text}", f"# TYPE {ns}_{name} {kind}", f"{ns}_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        * Serves ``GET /metrics`` in Prometheus text format from a daemon thread
+        * Returns the HTTP server, ``shutdown`` stops it (``port`` 0 picks a free port, see ``server_address``)
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _max_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -0,0 +1,84 @@
+import queue
+import threading
+from typing import Dict
+from src.domain.operations.ioperation import IOperation
+from src.infrastructure.pipeline.sinks import Sink
+from src.infrastructure.pipeline.sources import Source
+
+_END = object()
+
+
+class Pipeline:
+    """
+    * Runs an ``IOperation`` over the batches of a ``Source`` and writes the results to a ``Sink``
+    * Read, anonymize and write are separate threads joined by queues, so I/O overlaps with the clustering
+    * Bounded memory: no more than ``max_batches`` batches are alive at once
+            - The reader waits for a free slot before reading a new batch
+            - A slot is freed once the writer has written the anonymized batch
+    * Batches are written in the order they were read, each one anonymized on its own
+    """
+
+    def __init__(self, source: Source, operation: IOperation, sink: Sink, max_batches: int = 4):
+        assert max_batches >= 1
+        self.source = source
+        self.operation = operation
+        self.sink = sink
+        self.max_batches = max_batches
+
+    def run(self) -> Dict[str, int]:
+        """
+        * Processes the whole source and closes the source and the sink
+        * Re-raises the first error of any stage
+        * Returns the number of batches and rows written
+        """
+        slots = threading.Semaphore(self.max_batches)
+        to_anonymize, to_write = queue.Queue(), queue.Queue()
+        stop = threading.Event()
+        errors = []
+
+        def read():
+            try:
+                batches = iter(self.source)
+                while slots.acquire() and not stop.is_set():
+                    if (batch := next(batches, _END)) is _END:
+                        break
+                    to_anonymize.put(batch)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                to_anonymize.put(_END)
+
+        def anonymize():
+            try:
+                while (batch := to_anonymize.get()) is not _END:
+                    if not stop.is_set():
+                        to_write.put(self.operation.apply(batch))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                to_write.put(_END)
+
+        stats = {"batches": 0, "rows": 0}
+        threads = [threading.Thread(target=read, daemon=True), threading.Thread(target=anonymize, daemon=True)]
+        for thread in threads:
+            thread.start()
+        try:
+            while (batch := to_write.get()) is not _END:
+                if not stop.is_set():
+                    self.sink.write(batch)
+                    stats["batches"] += 1
+                    stats["rows"] += len(batch)
+                slots.release()
+        except Exception as error:
+            errors.append(error)
+        finally:
+            stop.set()
+            # wake up the reader if it waits for a slot
+            slots.release()
+            for thread in threads:
+                thread.join()
+            self.source.close()
+            self.sink.close()
+        if errors:
+            raise errors[0]
+        return stats
@@ -0,0 +1,175 @@
+import os
+import queue
+import socket
+import sys
+from abc import abstractmethod
+from typing import Optional, TextIO
+import numpy as np
+import pandas as pd
+from h3 import geo_to_h3, h3_to_center_child, h3_to_parent, h3_to_string, string_to_h3
+from src.application.Hexanonymity.H3Anonimyzer import split_latlon
+
+
+class Sink:
+    """
+    * Consumes the anonymized DataFrame batches, in the same order as they were read
+    """
+
+    @abstractmethod
+    def write(self, batch: pd.DataFrame) -> None:
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        pass
+
+
+class CsvSink(Sink):
+    def __init__(self, path: str, **to_csv_kwargs):
+        self.path = path
+        self.to_csv_kwargs = to_csv_kwargs
+        self._header = True
+
+    def write(self, batch: pd.DataFrame) -> None:
+        batch.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False, **self.to_csv_kwargs)
+        self._header = False
+
+
+class JsonlSink(Sink):
+    def __init__(self, path: str):
+        self.path = path
+        self._mode = "w"
+
+    def write(self, batch: pd.DataFrame) -> None:
+        with open(self.path, self._mode, encoding="utf-8") as file:
+            batch.to_json(file, orient="records", lines=True)
+            file.write("\n")
+        self._mode = "a"
+
+
+class ParquetSink(Sink):
+    """
+    * Writes every batch as a row group of a single Parquet file, needs ``pyarrow``
+    * The schema is taken from the first batch
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = None
+
+    def write(self, batch: pd.DataFrame) -> None:
+        import pyarrow as pa
+        from pyarrow.parquet import ParquetWriter
+
+        table = pa.Table.from_pandas(batch, preserve_index=False)
+        if self._writer is None:
+            self._writer = ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class H3ParquetSink(Sink):
+    """
+    * Writes anonymized batches as a Parquet dataset partitioned by H3 cell at ``resolution``, needs ``pyarrow``
+            - One Hive style directory per cell, ``h3_{resolution}={cell}``, one file per batch
+            - Rows are sorted by the finest cell of their position, row groups hold ``row_group_size`` rows
+    * Works with every output encoding of ``Hexanonimity`` through ``encoding``:
+            - ``"str"`` -> ``latlon_col`` holds ``"lat,lon"`` strings
+            - ``"float32"``, ``"float64"`` -> positions in ``{latlon_col}_lat`` and ``{latlon_col}_lon``
+            - ``"h3"`` -> ``latlon_col`` holds the cell of the cluster, coarser cells go to their center child
+    * Anonymized rows only take as many distinct positions as cluster centers, cells are computed once per center
+    """
+
+    def __init__(
+        self, path: str, latlon_col: str, resolution: int, encoding: str = "str", row_group_size: int = 100_000
+    ):
+        assert resolution in range(16)
+        self.path = path
+        self.latlon_col = latlon_col
+        self.resolution = resolution
+        self.encoding = encoding
+        self.row_group_size = row_group_size
+        self._batches = 0
+
+    def _center_cells(self, batch: pd.DataFrame):
+        """
+        * Returns the code of the center of every row and the resolution 15 cell of every center
+        """
+        if self.encoding == "h3":
+            codes, centers = pd.factorize(batch[self.latlon_col].to_numpy())
+            cells = [string_to_h3(h3_to_center_child(h3_to_string(int(c)), 15)) for c in centers]
+            return codes, np.array(cells, dtype=np.uint64)
+        if self.encoding == "str":
+            codes, centers = pd.factorize(batch[self.latlon_col].to_numpy())
+            lats, lons = split_latlon(np.asarray(centers))
+        else:
+            lat_codes, lat_values = pd.factorize(batch[f"{self.latlon_col}_lat"].to_numpy())
+            lon_codes, lon_values = pd.factorize(batch[f"{self.latlon_col}_lon"].to_numpy())
+            codes, pairs = pd.factorize(lat_codes.astype(np.int64) * len(lon_values) + lon_codes)
+            lats, lons = np.asarray(lat_values)[pairs // len(lon_values)], np.asarray(lon_values)[pairs % len(lon_values)]
+        cells = [string_to_h3(geo_to_h3(lat, lon, 15)) for lat, lon in zip(lats, lons)]
+        return codes, np.array(cells, dtype=np.uint64)
+
+    def write(self, batch: pd.DataFrame) -> None:
+        import pyarrow as pa
+        from pyarrow.parquet import write_table
+
+        codes, center_cells = self._center_cells(batch)
+        # sorting the centers is enough, rows follow the rank of their center
+        center_order = np.argsort(center_cells, kind="stable")
+        center_rank = np.empty(len(center_order), dtype=np.int64)
+        center_rank[center_order] = np.arange(len(center_order))
+        row_ranks = center_rank[codes]
+        row_order = np.argsort(row_ranks, kind="stable")
+        # cells sharing an ancestor are contiguous in H3 order, partitions are runs of sorted centers
+        partitions = [h3_to_parent(h3_to_string(int(c)), self.resolution) for c in center_cells[center_order]]
+        starts = [i for i in range(len(partitions)) if i == 0 or partitions[i] != partitions[i - 1]]
+        row_bounds = np.searchsorted(row_ranks[row_order], [*starts, len(partitions)])
+        table = pa.Table.from_pandas(batch, preserve_index=False)
+        for i, start, end in zip(starts, row_bounds, row_bounds[1:]):
+            partition = partitions[i]
+            directory = os.path.join(self.path, f"h3_{self.resolution}={partition}")
+            os.makedirs(directory, exist_ok=True)
+            rows = table.take(pa.array(row_order[start:end]))
+            write_table(rows, os.path.join(directory, f"part-{self._batches:05d}.parquet"), row_group_size=self.row_group_size)
+        self._batches += 1
+
+
+class StreamSink(Sink):
+    """
+    * Writes JSON lines, one record per line, to a text stream (stdout by default) or a local TCP server
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, address: Optional[tuple] = None):
+        self._socket: Optional[socket.socket] = None
+        if address is not None:
+            self._socket = socket.create_connection(address)
+            stream = self._socket.makefile("w", encoding="utf-8")
+        self.stream = stream if stream is not None else sys.stdout
+
+    def write(self, batch: pd.DataFrame) -> None:
+        batch.to_json(self.stream, orient="records", lines=True)
+        self.stream.write("\n")
+        self.stream.flush()
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self.stream.close()
+            self._socket.close()
+
+
+class QueueSink(Sink):
+    """
+    * Message queue stand-in: puts every batch in a ``queue.Queue`` and ``None`` once the pipeline ends
+    """
+
+    def __init__(self, messages: queue.Queue):
+        self.messages = messages
+
+    def write(self, batch: pd.DataFrame) -> None:
+        self.messages.put(batch)
+
+    def close(self) -> None:
+        self.messages.put(None)
@@ -0,0 +1,112 @@
+import json
+import queue
+import socket
+import sys
+from abc import abstractmethod
+from typing import Iterator, Optional, TextIO
+import pandas as pd
+
+
+class Source:
+    """
+    * Produces the data to anonymize as a sequence of DataFrame batches
+    * Batches are read lazily, one at a time, when the pipeline asks for them
+    """
+
+    def __init__(self, batch_rows: int = 100_000):
+        assert batch_rows >= 1
+        self.batch_rows = batch_rows
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        pass
+
+
+class CsvSource(Source):
+    def __init__(self, path: str, batch_rows: int = 100_000, **read_csv_kwargs):
+        super().__init__(batch_rows)
+        self.path = path
+        self.read_csv_kwargs = read_csv_kwargs
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        with pd.read_csv(self.path, chunksize=self.batch_rows, **self.read_csv_kwargs) as reader:
+            yield from reader
+
+
+class JsonlSource(Source):
+    def __init__(self, path: str, batch_rows: int = 100_000, dtype: Optional[dict] = None):
+        super().__init__(batch_rows)
+        self.path = path
+        self.dtype = dtype
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        with pd.read_json(self.path, lines=True, chunksize=self.batch_rows, dtype=self.dtype) as reader:
+            yield from reader
+
+
+class ParquetSource(Source):
+    """
+    * Reads a Parquet file by record batches, needs ``pyarrow``
+    """
+
+    def __init__(self, path: str, batch_rows: int = 100_000):
+        super().__init__(batch_rows)
+        self.path = path
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        from pyarrow.parquet import ParquetFile
+
+        with ParquetFile(self.path) as parquet:
+            for record_batch in parquet.iter_batches(batch_size=self.batch_rows):
+                yield record_batch.to_pandas()
+
+
+class StreamSource(Source):
+    """
+    * Reads JSON lines, one record per line, from a text stream (stdin by default) or a local TCP server
+    * The end of the stream ends the source
+    """
+
+    def __init__(
+        self, stream: Optional[TextIO] = None, address: Optional[tuple] = None, batch_rows: int = 10_000
+    ):
+        super().__init__(batch_rows)
+        self.address = address
+        self._socket: Optional[socket.socket] = None
+        if address is not None:
+            self._socket = socket.create_connection(address)
+            stream = self._socket.makefile("r", encoding="utf-8")
+        self.stream = stream if stream is not None else sys.stdin
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        records = []
+        for line in self.stream:
+            if line.strip():
+                records.append(json.loads(line))
+            if len(records) == self.batch_rows:
+                yield pd.DataFrame.from_records(records)
+                records = []
+        if records:
+            yield pd.DataFrame.from_records(records)
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self.stream.close()
+            self._socket.close()
+
+
+class QueueSource(Source):
+    """
+    * Message queue stand-in: takes DataFrame batches from a ``queue.Queue`` until it receives ``None``
+    """
+
+    def __init__(self, messages: queue.Queue):
+        super().__init__()
+        self.messages = messages
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        while (batch := self.messages.get()) is not None:
+            yield batch
@@ -0,0 +1,112 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+
+# columns of the shared block of a task, in order
+_LAYOUT = (("lats", np.float64), ("lons", np.float64), ("ids", np.int64), ("mod_indexes", np.int64), ("core_ps", np.int8), ("unsafe", np.bool_))
+
+
+def _views(buffer, n: int) -> dict:
+    views, offset = {}, 0
+    for name, dtype in _LAYOUT:
+        views[name] = np.ndarray((n,), dtype=dtype, buffer=buffer, offset=offset)
+        offset += n * np.dtype(dtype).itemsize
+    return views
+
+
+def _block_size(n: int) -> int:
+    return max(1, n * sum(np.dtype(dtype).itemsize for _, dtype in _LAYOUT))
+
+
+def _warm_up() -> None:
+    """
+    * Initializer of the workers: imports the engine and h3 and runs a first tiny clustering
+    """
+    StrictIdHexAnon(2).assign(np.array([42.2239522, 42.224499]), np.array([-8.7354573, -8.7357169]), np.array([1, 2]))
+
+
+def _assign_shared(engine: StrictIdHexAnon, name: str, n: int) -> dict:
+    """
+    * Runs in a worker: clusters the points of the shared block ``name`` and writes the result into it
+    """
+    # workers share the resource tracker of the parent, which unlinks the block
+    block = SharedMemory(name)
+    try:
+        views = _views(block.buf, n)
+        views["mod_indexes"][:] = engine.assign(
+            views["lats"], views["lons"], views["ids"], views["core_ps"], unsafe=views["unsafe"]
+        )
+        del views
+        return engine.stats
+    finally:
+        block.close()
+
+
+class SharedMemoryPool:
+    """
+    * Pool of warm worker processes for ``StrictIdHexAnon``, started once and reused by every call
+            - Workers are started from a clean process (``forkserver`` where available) and warmed up before use
+    * Data never goes through pickle, only the engine and the name of a shared memory block do:
+            - Positions and ids (as ``int64`` codes, the engine only compares them) are written to a ``SharedMemory`` block
+            - Workers cluster over views of the block and write the assignment array, core precisions
+              and unsafe flags back to it
+    * Used by ``Hexanonimity`` with its ``pool`` argument, also as a context manager
+    """
+
+    def __init__(self, max_workers: int = 1):
+        self.max_workers = max_workers
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self._executor = ProcessPoolExecutor(max_workers, mp_context=context, initializer=_warm_up)
+        # start every worker now, not on the first call
+        list(self._executor.map(int, range(max_workers)))
+
+    def assign(
+        self, engine: StrictIdHexAnon, lats: np.ndarray, lons: np.ndarray, ids: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+        """
+        * Same as ``StrictIdHexAnon.assign`` in a worker, returns ``(mod_indexes, core_ps, unsafe, stats)``
+        """
+        return self.assign_many(engine, [(lats, lons, ids)])[0]
+
+    def assign_many(
+        self, engine: StrictIdHexAnon, tasks: Sequence[Tuple[np.ndarray, np.ndarray, np.ndarray]]
+    ) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray, dict]]:
+        """
+        * Clusters every ``(lats, lons, ids)`` task on its own, in parallel over the workers
+        """
+        blocks: List[Optional[SharedMemory]] = []
+        try:
+            futures = []
+            for lats, lons, ids in tasks:
+                block = SharedMemory(create=True, size=_block_size(len(lats)))
+                blocks.append(block)
+                views = _views(block.buf, len(lats))
+                views["lats"][:], views["lons"][:] = lats, lons
+                views["ids"][:] = pd.factorize(np.asarray(ids))[0]
+                del views
+                futures.append(self._executor.submit(_assign_shared, engine, block.name, len(lats)))
+            results = []
+            for (lats, _, _), block, future in zip(tasks, blocks, futures):
+                stats = future.result()
+                views = _views(block.buf, len(lats))
+                results.append((views["mod_indexes"].copy(), views["core_ps"].copy(), views["unsafe"].copy(), stats))
+                del views
+            return results
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "SharedMemoryPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+import pandas as pd
+from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+from src.domain.operations.ioperation import IOperation
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+def _warm_up() -> None:
+    """
+    * Initializer of the worker processes
+    * Pays the import and first call costs of the engine once per worker, not once per request
+    """
+    frame = pd.DataFrame({"loc": ["42.2239522,-8.7354573", "42.224499,-8.7357169"], "id": ["1", "2"]})
+    Hexanonimity(fields=["loc"], id_col="id", sensitive_cols=[], configuration={"k": 2}).apply(frame)
+
+
+def _anonymize_batch(operation: IOperation, frames: List[pd.DataFrame]) -> List[Union[pd.DataFrame, Exception]]:
+    """
+    * Runs in a worker process all the requests coalesced for the same operation
+    * Adaptation of "one engine call per batch": every frame is still anonymized on its own
+            - Clustering frames of different requests together would leak positions from one request into another
+            - What is coalesced is the dispatch to the worker pool, paid once per batch instead of once per request
+    """
+    results = []
+    for frame in frames:
+        try:
+            results.append(operation.apply(frame))
+        except Exception as error:
+            results.append(error)
+    return results
+
+
+class Overloaded(Exception):
+    """
+    * Raised when accepting a request would exceed the pending rows limit of the server
+    """
+
+
+class RequestTooLarge(Exception):
+    """
+    * Raised when a single request has more rows than the pending rows limit, retrying will never succeed
+    """
+
+
+class _Batch:
+    def __init__(self, operation: IOperation):
+        self.operation = operation
+        self.frames: List[pd.DataFrame] = []
+        self.futures: List[asyncio.Future] = []
+        self.rows = 0
+        self.flusher: Optional[asyncio.TimerHandle] = None
+
+
+class AnonymizationServer:
+    """
+    * Local asyncio service anonymizing data with ``Hexanonimity``, over TCP or a Unix socket
+    * Speaks a minimal HTTP/1.1 with keep-alive:
+            - ``POST /anonymize`` with a JSON body ``{"fields", "id_col", "sensitive_cols", "configuration", "data"}``
+              where ``data`` maps every column name to its list of values, answers ``{"data": ...}`` with the same shape
+            - ``GET /health`` answers the counters of the server
+    * Concurrent requests with the same operation configuration are coalesced into one batch for the workers:
+            - A batch is sent after ``max_delay`` seconds or once it holds ``max_batch_rows`` rows
+            - Each request of a batch is still anonymized on its own, they never share clusters
+            - The CPU work runs in a pool of ``max_workers`` warm processes, off the event loop
+            - Workers are started before listening and from a clean process, never holding client sockets
+    * Backpressure:
+            - Requests are rejected with ``503`` while ``max_pending_rows`` rows are waiting or being processed
+            - A request with more than ``max_pending_rows`` rows is rejected with ``413``
+            - Requests not answered in ``request_timeout`` seconds get a ``504``
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        max_delay: float = 0.005,
+        max_batch_rows: int = 50_000,
+        max_pending_rows: int = 1_000_000,
+        request_timeout: float = 30.0,
+        max_body_bytes: int = 256 * 1024 * 1024,
+        executor: Optional[Executor] = None,
+    ):
+        self.max_workers = max_workers
+        self.max_delay = max_delay
+        self.max_batch_rows = max_batch_rows
+        self.max_pending_rows = max_pending_rows
+        self.request_timeout = request_timeout
+        self.max_body_bytes = max_body_bytes
+        self.stats = {"requests": 0, "batches": 0, "rejected": 0, "timeouts": 0}
+        self._executor = executor
+        self._own_executor = executor is None
+        self._batches: Dict[IOperation, _Batch] = {}
+        self._pending_rows = 0
+        self._workers: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080, path: Optional[str] = None) -> asyncio.AbstractServer:
+        """
+        * Starts the worker pool and listens on ``host:port``, or on the Unix socket ``path`` if given
+        """
+        if self._executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=context, initializer=_warm_up)
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self._executor, int) for _ in range(self.max_workers)))
+        self._workers = asyncio.Semaphore(self.max_workers)
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def anonymize(self, operation: IOperation, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        * Queues a frame in the batch of its operation and waits for its result
+        * Raises ``Overloaded`` when the server is over its pending rows limit
+        * Raises ``RequestTooLarge`` when the frame alone is over that limit
+        """
+        rows = len(frame)
+        if rows > self.max_pending_rows:
+            self.stats["rejected"] += 1
+            raise RequestTooLarge()
+        if self._pending_rows + rows > self.max_pending_rows:
+            self.stats["rejected"] += 1
+            raise Overloaded()
+        loop = asyncio.get_running_loop()
+        self._pending_rows += rows
+        future = loop.create_future()
+        future.add_done_callback(lambda done: self._release(done, rows))
+        batch = self._batches.get(operation)
+        if batch is None:
+            batch = self._batches[operation] = _Batch(operation)
+            batch.flusher = loop.call_later(self.max_delay, self._flush, operation)
+        batch.frames.append(frame)
+        batch.futures.append(future)
+        batch.rows += rows
+        self.stats["requests"] += 1
+        if batch.rows >= self.max_batch_rows:
+            self._flush(operation)
+        return await asyncio.wait_for(asyncio.shield(future), self.request_timeout)
+
+    def _release(self, future: asyncio.Future, rows: int) -> None:
+        self._pending_rows -= rows
+        if not future.cancelled():
+            # retrieved here so results of timed out requests don't log unretrieved exceptions
+            future.exception()
+
+    def _flush(self, operation: IOperation) -> None:
+        batch = self._batches.pop(operation, None)
+        if batch is not None:
+            batch.flusher.cancel()
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: _Batch) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._workers:
+            self.stats["batches"] += 1
+            try:
+                results = await loop.run_in_executor(self._executor, _anonymize_batch, batch.operation, batch.frames)
+            except Exception as error:
+                results = [error] * len(batch.futures)
+        for future, result in zip(batch.futures, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _route(self, method: str, target: str, body: bytes) -> Tuple[int, dict]:
+        if method == "GET" and target == "/health":
+            return 200, {"status": "ok", "pending_rows": self._pending_rows, **self.stats}
+        if method != "POST" or target != "/anonymize":
+            return 404, {"error": f"{method} {target} not found"}
+        try:
+            request = json.loads(body)
+            operation = Hexanonimity(
+                fields=request["fields"],
+                id_col=request["id_col"],
+                sensitive_cols=request.get("sensitive_cols") or [],
+                configuration=request.get("configuration", {}),
+            )
+            frame = pd.DataFrame(request["data"])
+        except (ValueError, KeyError, TypeError) as error:
+            return 400, {"error": f"invalid request: {error!r}"}
+        try:
+            result = await self.anonymize(operation, frame)
+        except RequestTooLarge:
+            return 413, {"error": f"more than {self.max_pending_rows} rows in a single request"}
+        except Overloaded:
+            return 503, {"error": "too many pending rows, retry later"}
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return 504, {"error": f"not answered in {self.request_timeout}s"}
+        except (ValueError, KeyError, TypeError) as error:
+            return 400, {"error": repr(error)}
+        except Exception as error:
+            return 500, {"error": repr(error)}
+        return 200, {"data": result.to_dict(orient="list")}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while request_line := await reader.readline():
+                keep_alive = True
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                    headers = {}
+                    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                except ValueError:
+                    status, payload, keep_alive = 400, {"error": "malformed request"}, False
+                else:
+                    if length > self.max_body_bytes:
+                        status, payload, keep_alive = 413, {"error": f"body over {self.max_body_bytes} bytes"}, False
+                    else:
+                        body = await reader.readexactly(length)
+                        try:
+                            status, payload = await self._route(method, target, body)
+                        except Exception as error:
+                            status, payload = 500, {"error": repr(error)}
+                content = json.dumps(payload).encode()
+                head = [
+                    f"HTTP/1.1 {status} {HTTP_REASONS[status]}",
+                    "Content-Type: application/json",
+                    f"Content-Length: {len(content)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                if status == 503:
+                    head.append("Retry-After: 1")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + content)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = AnonymizationServer(
+        max_workers=args.workers,
+        max_delay=args.max_delay,
+        max_batch_rows=args.max_batch_rows,
+        max_pending_rows=args.max_pending_rows,
+        request_timeout=args.request_timeout,
+    )
+    listener = await server.start(args.host, args.port, args.unix_socket)
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Hexanonymity anonymization service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix-socket", default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--max-delay", type=float, default=0.005, help="seconds to wait coalescing requests")
+    parser.add_argument("--max-batch-rows", type=int, default=50_000)
+    parser.add_argument("--max-pending-rows", type=int, default=1_000_000)
+    parser.add_argument("--request-timeout", type=float, default=30.0)
+    asyncio.run(_serve(parser.parse_args()))
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import pandas as pd
+from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+from src.infrastructure.server.anonymization_server import AnonymizationServer
+
+DATA = {
+    "a": ["-8.7354573,42.2239522", "-8.7357169,42.224499", "-8.8932563,42.1011589", "-8.8910411,42.08599"],
+    "id": ["1", "2", "1", "2"],
+    "b": ["a1", "b2", "c3", "d2"],
+}
+REQUEST = {"fields": ["a"], "id_col": "id", "sensitive_cols": ["b"], "configuration": {"k": 2}, "data": DATA}
+
+
+async def _post(port: int, payload: dict):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode()
+    writer.write(f"POST /anonymize HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    status = int((await reader.readline()).split()[1])
+    response = await reader.read()
+    writer.close()
+    return status, json.loads(response.split(b"\r\n\r\n", 1)[1])
+
+
+def test_anonymization_server_coalesces_requests():
+    async def scenario():
+        server = AnonymizationServer(max_workers=1, max_delay=0.2)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            responses = await asyncio.gather(*(_post(port, REQUEST) for _ in range(3)))
+            invalid = await _post(port, {"fields": ["a"]})
+        finally:
+            await server.close()
+        return server.stats, responses, invalid
+
+    stats, responses, (invalid_status, _) = asyncio.run(scenario())
+    expected = Hexanonimity(fields=["a"], id_col="id", sensitive_cols=["b"], configuration={"k": 2}).apply(
+        pd.DataFrame(DATA)
+    )
+    assert stats["requests"] == 3 and stats["batches"] == 1
+    for status, payload in responses:
+        assert status == 200
+        assert payload["data"] == expected.to_dict(orient="list")
+    assert invalid_status == 400
+
+
+def test_anonymization_server_error_statuses():
+    async def scenario():
+        server = AnonymizationServer(max_workers=1, max_pending_rows=2)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            too_large = await _post(port, REQUEST)
+            failing = await _post(port, {**REQUEST, "configuration": {"k": 1}, "data": {c: v[:2] for c, v in DATA.items()}})
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"garbage\r\n\r\n")
+            malformed = int((await reader.readline()).split()[1])
+            writer.close()
+        finally:
+            await server.close()
+        return too_large[0], failing[0], malformed
+
+    assert asyncio.run(scenario()) == (413, 500, 400)
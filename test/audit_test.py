@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.application.Hexanonymity.Audit import audit, audit_frames, compare
+from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+
+RNG = np.random.default_rng(19)
+N = 1500
+DF = pd.DataFrame(
+    {
+        "a": [f"{lat},{lon}" for lat, lon in zip(42.2 + RNG.random(N) / 50, -8.7 + RNG.random(N) / 50)],
+        "id": RNG.integers(0, 150, N).astype(str),
+    }
+)
+
+
+def test_audit_counts_distinct_ids():
+    report = audit(np.array([5, 5, 5, 7, 7, 9]), np.array(["x", "y", "x", "x", "x", "z"]), 2, np.array([0, 0, 0, 0, 0, 1]))
+
+    assert report["distinct_ids"].tolist() == [2, 1, 1] and report["min_distinct_ids"] == 1
+    assert report["outliers"].tolist() == [3, 4, 5]
+    assert report["violations"].tolist() == [1] and report["violating_rows"] == 2 and not report["passed"]
+    assert audit(np.empty(0), np.empty(0), 2)["passed"]
+
+
+def test_audit_anonymized_outputs():
+    results = {}
+    for configuration in ({"k": 3}, {"k": 3, "output": "float64"}, {"k": 3, "engine": "classic"}):
+        operation = Hexanonimity(configuration=configuration, fields=["a"], id_col="id", sensitive_cols=[])
+        anonymized = operation.apply(DF)
+        location_cols = ["a_lat", "a_lon"] if "output" in configuration else ["a"]
+        results[str(configuration)] = report = audit_frames(DF, anonymized, "id", location_cols, 3)
+        # at most the outliers of the run are not k-anonymous
+        assert report["violating_rows"] <= operation.stats["outliers"]
+    first, second, classic = results.values()
+    assert compare(first, second) == {}
+    assert "locations" in compare(first, classic)
+    assert audit_frames(DF, DF, "id", ["a"], 3)["violating_rows"] == N
+
+    with pytest.raises(ValueError):
+        audit_frames(DF, DF.iloc[1:], "id", ["a"], 3)
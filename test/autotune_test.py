@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from src.application.Hexanonymity.Autotune import tune_precision
+from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+
+RNG = np.random.default_rng(2)
+N = 4000
+LATS, LONS = 42.2 + RNG.random(N) / 10, -8.7 + RNG.random(N) / 10
+IDS = RNG.integers(0, 400, N).astype(str)
+
+
+def test_tune_precision_bounds():
+    tuning = tune_precision(LATS, LONS, IDS, k=3, sample_size=1000)
+    levels = tuning["levels"]
+
+    assert 0 <= tuning["min_p"] <= tuning["max_p"] <= 14
+    assert tuning["outlier_share"] <= 0.01 and levels[tuning["min_p"] + 1]["small_share"] > 0.01
+    assert levels[tuning["max_p"]]["groupable_share"] > 0 and levels[tuning["max_p"] + 1]["groupable_share"] == 0
+    assert levels[15]["cells"] <= N and levels[0]["cells"] == 1
+
+    tight = tune_precision(LATS, LONS, IDS, k=3, latency_budget=tuning["seconds"] / 2, sample_size=1000)
+    assert tight["min_p"] == tuning["min_p"] and tight["max_p"] < tuning["max_p"]
+
+
+def test_hexanonimity_autotune():
+    df = pd.DataFrame({"a": [f"{lat},{lon}" for lat, lon in zip(LATS, LONS)], "id": IDS})
+    operation = Hexanonimity(configuration={"k": 3, "autotune": True}, fields=["a"], id_col="id", sensitive_cols=[])
+    operation.apply(df)
+    tuning = operation.stats["autotune"]
+    assert (operation.min_p, operation.max_p) == (tuning["min_p"], tuning["max_p"])
+
+    operation = Hexanonimity(
+        configuration={"k": 3, "autotune": True, "max_p": 14}, fields=["a"], id_col="id", sensitive_cols=[]
+    )
+    operation.apply(df.iloc[:500])
+    assert operation.max_p == 14 and operation.min_p == operation.stats["autotune"]["min_p"]
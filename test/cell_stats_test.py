@@ -0,0 +1,13 @@
+from src.application.Hexanonymity.CellStats import CellStats, Ids, Indxs
+
+
+def test_combine_cells():
+    cells = [CellStats(2) for _ in range(3)]
+    for i, cell in enumerate(cells):
+        cell[Indxs.FREE].extend(range(i * 10, i * 10 + 10))
+        cell[Ids.FREE].add(str(i))
+    combined = CellStats(2)
+    for cell in cells:
+        combined.combine(cell)
+    assert list(combined[Indxs.FREE]) == list(range(30))
+    assert combined[Ids.FREE] == {"0", "1"}
@@ -0,0 +1,60 @@
+import os
+import numpy as np
+import pytest
+from src.application.Hexanonymity.Checkpoint import LevelCheckpoint
+from src.application.Hexanonymity.H3Anonimyzer import split_latlon
+from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+
+LATS, LONS = split_latlon(
+    np.array(["42.2239522,-8.7354573", "42.224499,-8.7357169", "42.1011589,-8.8932563", "42.08599,-8.8910411", "40.4168,-3.7038"])
+)
+IDS = np.array(["1", "2", "1", "2", "3"], dtype=object)
+
+
+def test_resume_from_last_level(tmp_path, monkeypatch):
+    expected = StrictIdHexAnon(k_anon=2).assign(LATS, LONS, IDS)
+    save, saved_levels = LevelCheckpoint.save, []
+
+    def interrupted_save(self, cells, mod_indexes, current_p, dot_level, params):
+        save(self, cells, mod_indexes, current_p, dot_level, params)
+        saved_levels.append(current_p)
+        if current_p == 6:
+            raise MemoryError()
+
+    monkeypatch.setattr(LevelCheckpoint, "save", interrupted_save)
+    with pytest.raises(MemoryError):
+        StrictIdHexAnon(k_anon=2, checkpoint_dir=str(tmp_path)).assign(LATS, LONS, IDS)
+    interrupted_levels = len(saved_levels)
+
+    resumed = StrictIdHexAnon(k_anon=2, checkpoint_dir=str(tmp_path), resume=True).assign(LATS, LONS, IDS)
+    assert (resumed == expected).all()
+    assert saved_levels[interrupted_levels] == 5
+    assert os.listdir(tmp_path) == []
+
+
+def test_resume_rejects_other_params(tmp_path):
+    LevelCheckpoint(str(tmp_path)).save({}, np.arange(5), 7, False, [3, 0, 14, 5])
+    with pytest.raises(ValueError):
+        StrictIdHexAnon(k_anon=2, checkpoint_dir=str(tmp_path), resume=True).assign(LATS, LONS, IDS)
+
+
+def test_resume_rejects_other_points(tmp_path, monkeypatch):
+    save = LevelCheckpoint.save
+
+    def save_once(self, *args):
+        save(self, *args)
+        raise MemoryError()
+
+    monkeypatch.setattr(LevelCheckpoint, "save", save_once)
+    with pytest.raises(MemoryError):
+        StrictIdHexAnon(k_anon=2, checkpoint_dir=str(tmp_path)).assign(LATS, LONS, IDS)
+    monkeypatch.setattr(LevelCheckpoint, "save", save)
+    # same number of points, other positions or ids
+    for lats, ids in ((LATS[::-1].copy(), IDS), (LATS, IDS[::-1].copy())):
+        with pytest.raises(ValueError):
+            StrictIdHexAnon(k_anon=2, checkpoint_dir=str(tmp_path), resume=True).assign(lats, LONS, ids)
+    # same points, other options
+    with pytest.raises(ValueError):
+        StrictIdHexAnon(k_anon=2, checkpoint_dir=str(tmp_path), resume=True, fast_p=10).assign(LATS, LONS, IDS)
+    StrictIdHexAnon(k_anon=2, checkpoint_dir=str(tmp_path), resume=True).assign(LATS, LONS, IDS)
+    assert os.listdir(tmp_path) == []
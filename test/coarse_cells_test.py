@@ -0,0 +1,66 @@
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+import pytest
+from h3 import geo_to_h3, get_pentagon_indexes, k_ring, string_to_h3
+from sortedcontainers import SortedList
+from src.application.Hexanonymity.CoarseCells import CoarseCells, generate_table, open_table
+from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+
+RNG = np.random.default_rng(23)
+N = 600
+LATS, LONS = RNG.uniform(40, 46, N), RNG.uniform(-9, -1, N)
+IDS = RNG.integers(0, 60, N).astype(str)
+
+
+def test_table_matches_k_ring(tmp_path):
+    path = str(tmp_path / "coarse.bin")
+    generate_table(path, max_res=2)
+    table = CoarseCells(path)
+    pentagon = min(get_pentagon_indexes(2))
+    h3_ids = sorted({geo_to_h3(lat, lon, 2) for lat, lon in zip(LATS, LONS)} | {pentagon, *k_ring(pentagon, 1)})
+
+    rings = table.rings(np.array([string_to_h3(h3_id) for h3_id in h3_ids], dtype=np.uint64), 2)
+    for h3_id, ring in zip(h3_ids, rings):
+        assert {string_to_h3(cell) for cell in k_ring(h3_id, 1)} == set(ring[ring != 0].tolist())
+    flower_overlaps = defaultdict(SortedList)
+    for h3_id in h3_ids:
+        for flower_cell_id in k_ring(h3_id, 1):
+            flower_overlaps[flower_cell_id].add(h3_id)
+    expected = sorted(tuple(o) for o in flower_overlaps.values() if len(o) > 1)
+    assert sorted(table.flower_overlaps(h3_ids, 2)) == expected
+
+    with open(path, "r+b") as corrupted:
+        corrupted.write(b'{"magic": "other"}')
+    with pytest.raises(ValueError):
+        CoarseCells(path)
+
+
+def test_engine_with_coarse_table(tmp_path, monkeypatch):
+    path = str(tmp_path / "coarse.bin")
+    generate_table(path, max_res=2)
+    engine = StrictIdHexAnon(3, max_p=1, coarse_res=2, coarse_table=path)
+    rings = []
+    monkeypatch.setattr(CoarseCells, "flower_overlaps", lambda self, *args: rings.append(args[1]) or [])
+    engine.assign(LATS, LONS, IDS)
+    assert sorted(set(rings)) == [1, 2]
+
+    monkeypatch.undo()
+    mod_indexes = engine.assign(LATS, LONS, IDS)
+    distinct_ids = pd.Series(IDS).groupby(mod_indexes).nunique()
+    assert (distinct_ids >= 3).sum() >= len(distinct_ids) - 1
+    assert (mod_indexes[mod_indexes] == mod_indexes).all()
+
+
+def test_hexanonimity_coarse_res(tmp_path, monkeypatch):
+    monkeypatch.setenv("HEXANONYMITY_CACHE", str(tmp_path))
+    open_table.cache_clear()
+    df = pd.DataFrame({"a": [f"{lat},{lon}" for lat, lon in zip(LATS, LONS)], "id": IDS})
+    operation = Hexanonimity(configuration={"k": 3, "max_p": 4, "coarse_res": 1}, fields=["a"], id_col="id", sensitive_cols=[])
+
+    operation.apply(df)
+    assert [p.name for p in tmp_path.iterdir()] == ["coarse-cells-v1-r1.bin"]
+    open_table.cache_clear()
+    with pytest.raises(ValueError):
+        Hexanonimity(configuration={"coarse_res": 7}, fields=["a"], id_col="id", sensitive_cols=[]).apply(df)
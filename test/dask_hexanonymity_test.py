@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+from src.infrastructure.distributed.dask_hexanonymity import anonymize_dask
+
+dd = pytest.importorskip("dask.dataframe")
+distributed = pytest.importorskip("distributed")
+
+
+def test_anonymize_dask_on_local_cluster():
+    df = pd.DataFrame(
+        {
+            "a": ["42.2239522,-8.7354573", "40.4168,-3.7038", "42.224499,-8.7357169", "40.4170,-3.7040"] * 3,
+            "id": [str(i % 5) for i in range(12)],
+            "b": list("abcdefghijkl"),
+        },
+        index=pd.RangeIndex(100, 112, name="row"),
+    )
+    ddf = dd.from_pandas(df, npartitions=3)
+    operation = Hexanonimity(fields=["a"], id_col="id", sensitive_cols=["b"], configuration={"k": 2, "min_p": 3})
+
+    with distributed.LocalCluster(n_workers=2, processes=False, dashboard_address=None) as cluster:
+        with distributed.Client(cluster):
+            result = anonymize_dask(ddf, operation, partition_p=3)
+            assert result.divisions == ddf.divisions
+            computed = result.compute()
+
+    # Vigo and Madrid never share a resolution 3 cell, so the spatial partitions give the single-node result
+    pd.testing.assert_frame_equal(computed, operation.apply(df))
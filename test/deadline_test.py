@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from src.application.Hexanonymity import StrictIdHexAnon as strict_module
+from src.application.Hexanonymity.Audit import audit_frames
+from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+
+RNG = np.random.default_rng(17)
+N = 1000
+LATS, LONS = 42.2 + RNG.random(N) / 50, -8.7 + RNG.random(N) / 50
+IDS = RNG.integers(0, 100, N).astype(str)
+
+
+def test_deadline_degrades_overlap_levels(monkeypatch):
+    # overlaps look too slow for the deadline while the levels have more than 100 cells
+    monkeypatch.setattr(strict_module, "seconds_per_cell", lambda k: 0.01)
+    engine = StrictIdHexAnon(3, deadline=1.0)
+    mod_indexes = engine.assign(LATS, LONS, IDS)
+
+    assert engine.stats["degraded_levels"] and max(engine.stats["degraded_levels"]) == 15
+    assert set(engine.stats["degraded_levels"]) <= set(engine.stats["fast_levels"])
+    assert engine.stats["skipped_levels"] == []
+    distinct_ids = pd.Series(IDS).groupby(mod_indexes).nunique()
+    assert (distinct_ids >= 3).sum() >= len(distinct_ids) - 1
+
+
+def test_deadline_passed_groups_cells_of_min_p():
+    engine = StrictIdHexAnon(3, min_p=4, deadline=1e-9)
+    core_ps, unsafe = np.empty(N, dtype=np.int8), np.empty(N, dtype=bool)
+    mod_indexes = engine.assign(LATS, LONS, IDS, core_ps, unsafe=unsafe)
+
+    assert engine.stats["skipped_levels"] == [*range(15, 4, -1), 5]
+    assert engine.stats["cores"] >= 1 and unsafe.sum() == engine.stats["outliers"] < N
+    assert (mod_indexes[mod_indexes] == mod_indexes).all() and (core_ps[mod_indexes] == 4).all()
+    distinct_ids = pd.Series(IDS).groupby(mod_indexes).transform("nunique").to_numpy()
+    assert (unsafe | (distinct_ids >= 3)).all()
+
+
+def test_hexanonimity_deadline_passed_is_audited():
+    rng = np.random.default_rng(5)
+    lats, lons = 40 + rng.random(N) * 2, -9 + rng.random(N) * 2
+    ids = rng.integers(0, 300, N).astype(str)
+    df = pd.DataFrame({"a": [f"{lat},{lon}" for lat, lon in zip(lats, lons)], "id": ids})
+    for min_p in (0, 4):
+        configuration = {"k": 3, "min_p": min_p, "deadline": 1e-6, "unsafe_col": "unsafe"}
+        operation = Hexanonimity(configuration=configuration, fields=["a"], id_col="id", sensitive_cols=[])
+
+        anonymized = operation.apply(df)
+        report = audit_frames(df, anonymized, "id", ["a"], 3, unsafe_col="unsafe")
+        assert report["passed"] and anonymized["unsafe"].sum() == operation.stats["outliers"]
+        # points are moved, not released at their raw location
+        assert (anonymized["a"] != df["a"]).mean() > 0.5
+
+
+def test_hexanonimity_deadline_per_window():
+    df = pd.DataFrame(
+        {
+            "a": [f"{lat},{lon}" for lat, lon in zip(LATS, LONS)],
+            "id": IDS,
+            "time": pd.to_datetime("2022-01-21") + pd.to_timedelta(RNG.integers(0, 7200, N), unit="s"),
+        }
+    )
+    configuration = {"k": 3, "deadline": 60, "time_bucket": "1h"}
+    operation = Hexanonimity(configuration=configuration, fields=["a"], id_col="id", sensitive_cols=[], time_col="time")
+
+    operation.apply(df)
+    assert operation.stats["degraded_levels"] == [] and operation.stats["skipped_levels"] == []
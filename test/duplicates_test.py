@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+from src.application.Hexanonymity.Duplicates import collapse_duplicates, expand_assignment
+from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+
+RNG = np.random.default_rng(11)
+N = 300
+LATS, LONS = 42.2 + RNG.random(N) / 100, -8.7 + RNG.random(N) / 100
+IDS = RNG.integers(0, 40, N).astype(str)
+# parked vehicles, repeating their last position
+REPEATS = np.r_[np.arange(N), RNG.integers(0, 20, 2000)]
+ORDER = RNG.permutation(len(REPEATS))
+LATS, LONS, IDS = LATS[REPEATS][ORDER], LONS[REPEATS][ORDER], IDS[REPEATS][ORDER]
+
+
+def test_collapse_keeps_k_per_key():
+    kept, firsts = collapse_duplicates([np.array(["a", "b", "a", "a", "b", "a"])], 2)
+
+    assert kept.tolist() == [0, 1, 2, 4]
+    assert firsts.tolist() == [0, 1, 0, 0, 1, 0]
+    assert expand_assignment(np.array([0, 1, 0, 1]), kept, firsts).tolist() == [0, 1, 0, 0, 1, 0]
+
+
+def test_collapsed_run_matches_full_run():
+    # cell by cell grouping doesn't depend on the size of the free lists, results are the same
+    for collapse in StrictIdHexAnon.COLLAPSE_MODES:
+        full_core_ps, core_ps = np.empty(len(LATS), dtype=np.int8), np.empty(len(LATS), dtype=np.int8)
+        full = StrictIdHexAnon(3, min_p=5, fast_p=0).assign(LATS, LONS, IDS, full_core_ps)
+        engine = StrictIdHexAnon(3, min_p=5, fast_p=0, collapse=collapse)
+        mod_indexes = engine.assign(LATS, LONS, IDS, core_ps)
+
+        assert (mod_indexes == full).all()
+        assert (core_ps[mod_indexes] == full_core_ps[full]).all()
+        assert engine.stats["collapsed"] > 1000 and engine.stats["points"] == len(LATS)
+
+
+def test_collapsed_overlaps_keep_k_anonymity():
+    engine = StrictIdHexAnon(3, collapse="cell")
+    mod_indexes = engine.assign(LATS, LONS, IDS)
+
+    distinct_ids = pd.Series(IDS).groupby(mod_indexes).nunique()
+    assert (distinct_ids >= 3).sum() >= len(distinct_ids) - 1
+    assert (mod_indexes[mod_indexes] == mod_indexes).all()
+    assert engine.stats["outliers"] == np.isin(mod_indexes, distinct_ids.index[distinct_ids < 3]).sum()
@@ -1,7 +1,9 @@
+import pytest
 import pandas as pd
 import numpy as np
 from numpy import array
 from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+from src.infrastructure.cache.result_cache import ResultCache
 
 def test_hexanonimity():
     df = pd.DataFrame(
@@ -124,3 +126,219 @@ def test_hexanonimity_idcol():
         dtype=str,
     )
     assert (result["a"].values == expected).all()
+
+
+def test_hexanonimity_result_independent_from_input():
+    df = pd.DataFrame(
+        {
+            "a": pd.Series(
+                array(
+                    [
+                        "-8.7354573,42.2239522",
+                        "-8.7357169,42.224499",
+                        "-8.8932563,42.1011589",
+                        "-8.8910411,42.08599",
+                    ]
+                ),
+                dtype=str,
+            ),
+            "id": pd.Series(array(["1", "2", "1", "2"]), dtype=str),
+            "b": pd.Series(array(["a1", "b2", "c3", "d2"]), dtype=str),
+            "speed": pd.Series(array([10.0, 20.0, 30.0, 40.0])),
+        }
+    )
+    original = df.copy()
+    operation = Hexanonimity(
+        configuration={"k": 2, "min_p": 0, "max_p": 14}, fields=["a"], id_col="id", sensitive_cols=["b"]
+    )
+
+    for copy_on_write in (False, True):
+        with pd.option_context("mode.copy_on_write", copy_on_write):
+            result = operation.apply(df)
+            assert np.shares_memory(result["speed"].values, df["speed"].values) == copy_on_write
+            result.loc[0, "speed"] = 999.0
+            result.loc[0, "b"] = "changed"
+        pd.testing.assert_frame_equal(df, original)
+    assert (result["a"].values[1:] == array(["-8.7354573,42.2239522", "-8.8932563,42.1011589", "-8.8932563,42.1011589"])).all()
+
+
+def test_assemble_never_copies_critical_columns():
+    import tracemalloc
+    from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+
+    n = 1_000_000
+    locs = pd.DataFrame({"critical": np.arange(n, dtype=np.float64), "other": np.zeros(n, dtype=np.int8)})
+    mod_indexes = np.arange(n)[::-1].copy()
+    with pd.option_context("mode.copy_on_write", False):
+        tracemalloc.start()
+        result = StrictIdHexAnon.assemble(locs, mod_indexes, [0])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    # the rebuilt critical column plus a copy of the small one, not a copy of the whole frame first
+    assert peak < 1.2 * locs["critical"].nbytes + locs["other"].nbytes
+    assert list(result.columns) == ["critical", "other"] and result["critical"].iloc[0] == n - 1
+
+
+def test_hexanonimity_time_bucket():
+    locations = ["-8.7354573,42.2239522", "-8.7357169,42.224499", "-8.8932563,42.1011589", "-8.8910411,42.08599"]
+    df = pd.DataFrame(
+        {
+            "a": locations * 2,
+            "id": ["1", "2", "1", "2", "3", "4", "3", "4"],
+            "time": pd.to_datetime(["2022-01-21 08:10", "2022-01-21 09:20"] * 4),
+        }
+    )
+    configuration = {"k": 2, "time_bucket": "1h", "n_jobs": 2}
+    operation = Hexanonimity(configuration=configuration, fields=["a"], id_col="id", sensitive_cols=[], time_col="time")
+
+    result = operation.apply(df)
+    single = Hexanonimity(configuration={"k": 2}, fields=["a"], id_col="id", sensitive_cols=[])
+    for _, window in df.groupby(df["time"].dt.hour):
+        expected = single.apply(window.reset_index(drop=True))
+        assert (result.loc[window.index, "a"].values == expected["a"].values).all()
+
+
+def test_hexanonimity_output_encodings():
+    from h3 import geo_to_h3, h3_get_resolution, h3_to_parent, h3_to_string
+
+    df = pd.DataFrame(
+        {
+            "a": ["42.2239522,-8.7354573", "42.224499,-8.7357169", "42.1011589,-8.8932563", "42.08599,-8.8910411"],
+            "id": ["1", "2", "1", "2"],
+        }
+    )
+    as_str = Hexanonimity(configuration={"k": 2}, fields=["a"], id_col="id", sensitive_cols=[]).apply(df)
+    as_float = Hexanonimity(configuration={"k": 2, "output": "float32"}, fields=["a"], id_col="id", sensitive_cols=[]).apply(df)
+    as_h3 = Hexanonimity(configuration={"k": 2, "output": "h3"}, fields=["a"], id_col="id", sensitive_cols=[]).apply(df)
+
+    assert list(as_float.columns) == ["a_lat", "a_lon", "id"] and as_float["a_lat"].dtype == np.float32
+    for latlon, lat, lon, cell in zip(as_str["a"], as_float["a_lat"], as_float["a_lon"], as_h3["a"]):
+        expected_lat, expected_lon = map(float, latlon.split(","))
+        assert np.isclose(lat, expected_lat) and np.isclose(lon, expected_lon)
+        cell = h3_to_string(int(cell))
+        assert h3_to_parent(geo_to_h3(expected_lat, expected_lon, 15), h3_get_resolution(cell)) == cell
+    assert as_h3["a"].dtype == np.uint64
+
+
+def test_hexanonimity_categorical():
+    df = pd.DataFrame(
+        {
+            "a": ["-8.7354573,42.2239522", "-8.7357169,42.224499", "-8.8932563,42.1011589", "-8.8910411,42.08599"],
+            "id": ["1", "2", "1", "2"],
+            "b": ["a1", "b2", "c3", "d2"],
+        }
+    )
+    plain = Hexanonimity(configuration={"k": 2}, fields=["a"], id_col="id", sensitive_cols=["b"]).apply(df)
+    result = Hexanonimity(
+        configuration={"k": 2, "categorical": True}, fields=["a"], id_col="id", sensitive_cols=["b"]
+    ).apply(df)
+
+    for col in ("a", "b"):
+        assert result[col].dtype == "category"
+        assert len(result[col].cat.categories) == 2
+        assert (result[col].astype(str).values == plain[col].values).all()
+    assert result["id"].dtype == object
+
+
+def test_hexanonimity_hybrid_fast_mode():
+    df = pd.DataFrame(
+        {
+            "a": ["-8.7354573,42.2239522", "-8.7357169,42.224499", "-8.8932563,42.1011589", "-8.8910411,42.08599"],
+            "id": ["1", "2", "1", "2"],
+        }
+    )
+    operation = Hexanonimity(configuration={"k": 2, "fast_p": 10}, fields=["a"], id_col="id", sensitive_cols=[])
+
+    result = operation.apply(df)
+    assert operation.stats["fast_levels"] == list(range(15, 9, -1))
+    assert operation.stats["overlap_levels"] and max(operation.stats["overlap_levels"]) == 9
+    assert result["a"].nunique() == 2 and (result["a"].value_counts() == 2).all()
+
+
+def test_hexanonimity_apply_many():
+    rng = np.random.default_rng(3)
+    frames = [
+        pd.DataFrame(
+            {
+                "a": [f"{lat},{lon}" for lat, lon in zip(42.2 + rng.random(n) / 50, -8.7 + rng.random(n) / 50)],
+                "id": rng.integers(0, 4, n).astype(str),
+                "b": np.arange(n),
+            },
+            index=np.arange(n) + 100,
+        )
+        for n in (7, 1, 12, 5)
+    ]
+    operation = Hexanonimity(configuration={"k": 2}, fields=["a"], id_col="id", sensitive_cols=["b"])
+
+    def check(frame, result):
+        # clusters stay within the dataset, with k distinct ids or as the outliers of the dataset
+        pd.testing.assert_frame_equal(result[["id"]], frame[["id"]])
+        assert set(result["a"]) <= set(frame["a"])
+        centers = frame.set_index("a").loc[result["a"].unique(), "b"]
+        assert (result["b"].values == centers.loc[result["a"]].values).all()
+        small = result.groupby("a")["id"].nunique() < 2
+        assert small.sum() <= 1
+
+    results = operation.apply_many(frames)
+    assert len(results) == len(frames)
+    for frame, result in zip(frames, results):
+        check(frame, result)
+
+    tenants = pd.concat(frames, keys=["t0", "t1", "t2", "t3"]).reset_index(level=0).rename(columns={"level_0": "tenant"})
+    by_tenant = operation.apply_many(tenants, group_col="tenant")
+    assert list(by_tenant) == ["t0", "t1", "t2", "t3"]
+    for frame, result in zip(frames, by_tenant.values()):
+        check(frame, result.drop(columns="tenant"))
+
+
+def test_hexanonimity_engines():
+    from src.application.Hexanonymity.EngineSelection import BYTES_PER_POINT, choose_engine
+
+    df = pd.DataFrame(
+        {
+            "a": ["-8.7354573,42.2239522", "-8.7357169,42.224499", "-8.8932563,42.1011589", "-8.8910411,42.08599"],
+            "id": ["1", "2", "1", "2"],
+        }
+    )
+    strict = Hexanonimity(configuration={"k": 2}, fields=["a"], id_col="id", sensitive_cols=[]).apply(df)
+    for engine in ("id", "classic", "auto"):
+        operation = Hexanonimity(configuration={"k": 2, "engine": engine}, fields=["a"], id_col="id", sensitive_cols=[])
+        result = operation.apply(df)
+        assert result["a"].nunique() == 2 and (result["a"].value_counts() == 2).all()
+        assert set(result["a"]) <= set(df["a"])
+    assert (result["a"].values == strict["a"].values).all()
+    assert operation.stats["engine_choice"] == {"engine": "strict", "execution": "single"}
+    assert "engine_choice" not in operation.configuration.params
+
+    # the choice doesn't change the configuration, nor the keys of the cache
+    cache = ResultCache()
+    operation = Hexanonimity(
+        configuration={"k": 2, "engine": "auto"}, fields=["a"], id_col="id", sensitive_cols=[], cache=cache
+    )
+    configuration = operation.configuration
+    operation.apply(df)
+    assert operation.configuration == configuration and hash(operation.configuration) == hash(configuration)
+    operation.apply(df)
+    assert operation.stats == {"cache_hit": True}
+
+    # one id can't build id-level groups, only the levels of min_p + 1 analyze overlaps
+    operation = Hexanonimity(
+        configuration={"k": 2, "engine": "auto", "min_p": 3}, fields=["a"], id_col="id", sensitive_cols=[]
+    )
+    operation.apply(df.assign(id="1"))
+    assert operation.engine_choice["fast_p"] == 5 and operation.stats["overlap_levels"] == [4, 4]
+
+    assert choose_engine(10**6, 10**5, 2, 0, memory=10**6 * BYTES_PER_POINT, allow_spill=True)["spill_cells"] == 10**6 // 2
+    # spilling lowers the utility, never chosen without allow_spill
+    assert choose_engine(10**6, 10**5, 2, 0, memory=10**6 * BYTES_PER_POINT) == {
+        "engine": "strict",
+        "execution": "single",
+        "fits_memory": False,
+    }
+    assert choose_engine(10**5, 10**4, 2, 0, time_windows=3, memory=10**12, cpus=8)["n_jobs"] == 3
+    assert choose_engine(100, 10, 2, 0, time_windows=3, memory=10**12, cpus=8)["execution"] == "single"
+
+    with pytest.raises(ValueError):
+        Hexanonimity(configuration={"engine": "fast"}, fields=["a"], id_col="id", sensitive_cols=[]).apply(df)
+    with pytest.raises(ValueError):
+        Hexanonimity(configuration={"engine": "id", "fast_p": 10}, fields=["a"], id_col="id", sensitive_cols=[]).apply(df)
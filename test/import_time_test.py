@@ -0,0 +1,40 @@
+import json
+import subprocess
+import sys
+
+# cold import of the operation, measured in a fresh interpreter
+IMPORT_BUDGET_S = 0.2
+HEAVY_MODULES = ("pandas", "h3", "pydantic", "sortedcontainers")
+
+_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import src.application.Hexanonymity.Hexanonymity
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def _probe() -> dict:
+    output = subprocess.run([sys.executable, "-c", _PROBE], capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def test_import_skips_heavy_dependencies():
+    assert _probe()["loaded"] == []
+
+
+def test_import_time_budget():
+    # best of a few runs, to ignore a cold file cache
+    assert min(_probe()["elapsed"] for _ in range(3)) < IMPORT_BUDGET_S
+
+
+def test_kepler_configs_load_lazily():
+    from src.application.Hexanonymity.H3Anonimyzer import H3Anonimyzer
+    from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+
+    config = StrictIdHexAnon(k_anon=2).kepler_config
+    assert config["version"] == "v1"
+    config["version"] = "changed"
+    assert StrictIdHexAnon(k_anon=2).kepler_config["version"] == "v1"
+    assert issubclass(StrictIdHexAnon, H3Anonimyzer)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from src.application.Hexanonymity.Audit import audit
+from src.application.Hexanonymity.IncrementalHexAnon import IncrementalHexAnon
+from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+
+VIGO = pd.DataFrame(
+    {
+        "a": ["42.2239522,-8.7354573", "42.224499,-8.7357169", "42.1011589,-8.8932563", "42.08599,-8.8910411"],
+        "id": ["1", "2", "1", "2"],
+    }
+)
+MADRID = pd.DataFrame({"a": ["40.4168,-3.7038", "40.4170,-3.7040"], "id": ["3", "4"]})
+
+
+def test_incremental_keeps_untouched_cells(tmp_path):
+    anonymizer = IncrementalHexAnon(k_anon=2, min_p=4)
+    first = anonymizer.apply_append(VIGO.iloc[:0], VIGO, "id", "a")
+    pd.testing.assert_frame_equal(first, StrictIdHexAnon(k_anon=2, min_p=4).apply_one_col(VIGO, "id", "a"))
+
+    anonymizer.save(str(tmp_path / "state.npz"))
+    anonymizer = IncrementalHexAnon.load(str(tmp_path / "state.npz"))
+    before = anonymizer.mod_indexes.copy()
+    second = anonymizer.apply_append(VIGO, MADRID, "id", "a")
+
+    assert anonymizer.touched_cells == 1
+    assert (anonymizer.mod_indexes[: len(VIGO)] == before).all()
+    assert (second["a"].values[:4] == first["a"].values).all()
+    assert second["a"].values[4] == second["a"].values[5] and second["a"].values[4] in MADRID["a"].values
+
+
+def test_incremental_never_moves_released_rows():
+    rng = np.random.default_rng(8)
+    n = 600
+    lats, lons = 42.2 + rng.random(n) / 50, -8.7 + rng.random(n) / 50
+    ids = rng.integers(0, 150, n).astype(str)
+    anonymizer = IncrementalHexAnon(k_anon=3, min_p=0)
+    # a first point alone is an outlier, clustered again with the next ones
+    anonymizer.append(lats[:1], lons[:1], ids[:1])
+    assert anonymizer.unsafe.tolist() == [True]
+    for start, end in ((1, 400), (400, 550), (550, 600)):
+        before, released = anonymizer.mod_indexes.copy(), ~anonymizer.unsafe
+        mod_indexes = anonymizer.append(lats[start:end], lons[start:end], ids[start:end])
+
+        assert (mod_indexes[:start][released] == before[released]).all()
+        assert (mod_indexes[mod_indexes] == mod_indexes).all()
+        assert audit(mod_indexes, ids[:end], 3, anonymizer.unsafe)["passed"] and not anonymizer.unsafe.any()
@@ -0,0 +1,40 @@
+import urllib.request
+import pandas as pd
+from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+from src.infrastructure.metrics.metrics import AnonymizationMetrics
+
+DF = pd.DataFrame(
+    {
+        "a": ["-8.7354573,42.2239522", "-8.7357169,42.224499", "-8.8932563,42.1011589", "-8.8910411,42.08599", "40.4,-3.7"],
+        "id": ["1", "2", "1", "2", "3"],
+    }
+)
+
+
+def test_metrics_of_apply_calls():
+    metrics = AnonymizationMetrics(fold_every=1)
+    operation = Hexanonimity(configuration={"k": 2}, fields=["a"], id_col="id", sensitive_cols=[], metrics=metrics)
+    operation.apply(DF)
+    operation.apply_many([DF, DF.iloc[:2]])
+
+    values = metrics.snapshot()
+    assert values["calls"] == 2 and values["points"] == 12
+    assert values["cores"] >= 3 and values["outliers"] == 2
+    assert values["outlier_share"] == 2 / 12
+    assert values["latency_buckets"][float("inf")] == 2
+    assert values["max_cells"] == 7 and values["points_per_second"] > 0
+
+
+def test_metrics_prometheus_endpoint():
+    metrics = AnonymizationMetrics()
+    Hexanonimity(configuration={"k": 2}, fields=["a"], id_col="id", sensitive_cols=[], metrics=metrics).apply(DF)
+    server = metrics.serve(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            text = response.read().decode()
+    finally:
+        server.shutdown()
+    assert 'hexanonymity_apply_seconds_bucket{le="+Inf"} 1' in text
+    assert "hexanonymity_apply_seconds_count 1" in text
+    assert "hexanonymity_points_total 5" in text
+    assert "# TYPE hexanonymity_outliers_total counter" in text
@@ -0,0 +1,87 @@
+import queue
+import pandas as pd
+from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+from src.infrastructure.pipeline.pipeline import Pipeline
+from src.infrastructure.pipeline.sinks import CsvSink, H3ParquetSink, ParquetSink, QueueSink
+from src.infrastructure.pipeline.sources import CsvSource, JsonlSource, QueueSource
+
+DATA = pd.DataFrame(
+    {
+        "a": ["-8.7354573,42.2239522", "-8.7357169,42.224499", "-8.8932563,42.1011589", "-8.8910411,42.08599"] * 3,
+        "id": ["1", "2", "1", "2"] * 3,
+        "b": ["a1", "b2", "c3", "d2"] * 3,
+    }
+)
+
+
+def _operation():
+    return Hexanonimity(fields=["a"], id_col="id", sensitive_cols=["b"], configuration={"k": 2})
+
+
+def test_pipeline_csv_to_parquet(tmp_path):
+    DATA.to_csv(tmp_path / "in.csv", index=False)
+    stats = Pipeline(
+        CsvSource(str(tmp_path / "in.csv"), batch_rows=4, dtype=str), _operation(), ParquetSink(str(tmp_path / "out.parquet"))
+    ).run()
+
+    expected = pd.concat([_operation().apply(DATA.iloc[i : i + 4].reset_index(drop=True)) for i in range(0, 12, 4)])
+    assert stats == {"batches": 3, "rows": 12}
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "out.parquet"), expected.reset_index(drop=True))
+
+
+def test_pipeline_bounds_batches_in_flight(tmp_path):
+    DATA.to_json(tmp_path / "in.jsonl", orient="records", lines=True)
+    read, written = [], []
+
+    class CountingSource(JsonlSource):
+        def __iter__(self):
+            for batch in super().__iter__():
+                read.append(len(written))
+                yield batch
+
+    class CountingSink(CsvSink):
+        def write(self, batch):
+            assert len(read) - len(written) <= 2
+            written.append(batch)
+            super().write(batch)
+
+    source = CountingSource(str(tmp_path / "in.jsonl"), batch_rows=2, dtype={"id": str})
+    Pipeline(source, _operation(), CountingSink(str(tmp_path / "out.csv")), max_batches=2).run()
+    assert len(written) == 6
+
+
+def test_pipeline_queue_source_and_sink():
+    inbox, outbox = queue.Queue(), queue.Queue()
+    inbox.put(DATA)
+    inbox.put(None)
+    Pipeline(QueueSource(inbox), _operation(), QueueSink(outbox)).run()
+    pd.testing.assert_frame_equal(outbox.get(), _operation().apply(DATA))
+    assert outbox.get() is None
+
+
+def test_h3_parquet_sink_partitions_by_cell(tmp_path):
+    from h3 import geo_to_h3, h3_to_parent
+
+    df = pd.DataFrame(
+        {
+            "a": ["42.2239522,-8.7354573", "40.4168,-3.7038", "42.224499,-8.7357169", "40.4170,-3.7040"] * 2,
+            "id": ["1", "2", "3", "4"] * 2,
+        }
+    )
+    for encoding in ("str", "float64", "h3"):
+        operation = Hexanonimity(fields=["a"], id_col="id", sensitive_cols=[], configuration={"k": 2, "output": encoding})
+        sink = H3ParquetSink(str(tmp_path / encoding), "a", resolution=3, encoding=encoding, row_group_size=2)
+        Pipeline(QueueSource(_queue_of(df)), operation, sink).run()
+        written = pd.read_parquet(tmp_path / encoding)
+
+        vigo, madrid = (h3_to_parent(geo_to_h3(lat, lon, 15), 3) for lat, lon in ((42.2239522, -8.7354573), (40.4168, -3.7038)))
+        assert sorted(written["h3_3"].astype(str).unique()) == sorted([vigo, madrid])
+        assert len(written) == len(df)
+        assert (written.groupby("h3_3").size() == 4).all()
+
+
+def _queue_of(*batches):
+    messages = queue.Queue()
+    for batch in (*batches, None):
+        messages.put(batch)
+    return messages
@@ -0,0 +1,44 @@
+import pandas as pd
+from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+from src.infrastructure.cache.result_cache import ResultCache
+
+DF = pd.DataFrame(
+    {
+        "a": ["-8.7354573,42.2239522", "-8.7357169,42.224499", "-8.8932563,42.1011589", "-8.8910411,42.08599"],
+        "id": ["1", "2", "1", "2"],
+        "b": ["a1", "b2", "c3", "d2"],
+        "other": [1, 2, 3, 4],
+    }
+)
+
+
+def operation(cache, k=2):
+    return Hexanonimity(configuration={"k": k}, fields=["a"], id_col="id", sensitive_cols=["b"], cache=cache)
+
+
+def test_result_cache_hits(tmp_path):
+    cache = ResultCache(max_entries=2, directory=str(tmp_path))
+    expected = operation(cache).apply(DF)
+    cached_operation = operation(cache)
+    pd.testing.assert_frame_equal(cached_operation.apply(DF), expected)
+    assert (cache.hits, cache.misses) == (1, 1) and cached_operation.stats == {"cache_hit": True}
+    assert cached_operation.fields == ["a"]
+
+    # columns the operation doesn't read are not part of the key
+    changed_other = operation(cache).apply(DF.assign(other=0))
+    assert cache.hits == 2 and (changed_other["other"] == 0).all()
+    operation(cache).apply(DF.assign(id=["1", "1", "1", "2"]))
+    operation(cache, k=3).apply(DF)
+    assert cache.misses == 3 and len(cache) == 2
+
+    # evicted from memory, read back from disk
+    fresh = ResultCache(directory=str(tmp_path))
+    pd.testing.assert_frame_equal(operation(fresh).apply(DF), expected)
+    assert fresh.hits == 1 and len(list(tmp_path.glob("*.npz"))) == 3
+
+
+def test_result_cache_key():
+    key = ResultCache.key(operation(None), DF)
+    assert key == ResultCache.key(operation(None), DF.copy())
+    assert key != ResultCache.key(operation(None), DF.iloc[::-1].reset_index(drop=True))
+    assert key != ResultCache.key(operation(None, k=3), DF)
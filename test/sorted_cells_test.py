@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+
+RNG = np.random.default_rng(13)
+N = 2000
+LATS, LONS = 42.2 + RNG.random(N) / 50, -8.7 + RNG.random(N) / 50
+IDS = RNG.integers(0, 200, N).astype(str)
+
+
+def test_sorted_run_matches_unsorted_run():
+    # cell by cell grouping builds the same cores, free points may join another core of their cell
+    full_engine, engine = StrictIdHexAnon(3, fast_p=0), StrictIdHexAnon(3, fast_p=0, sort_points=True)
+    full = full_engine.assign(LATS, LONS, IDS)
+    mod_indexes = engine.assign(LATS, LONS, IDS)
+
+    assert engine.stats == full_engine.stats
+    assert len(np.unique(mod_indexes)) == len(np.unique(full))
+    assert (mod_indexes[mod_indexes] == mod_indexes).all()
+
+
+def test_sorted_overlaps_keep_k_anonymity():
+    groups = RNG.integers(0, 3, N)
+    engine = StrictIdHexAnon(3, sort_points=True)
+    mod_indexes = engine.assign(LATS, LONS, IDS, groups=groups)
+
+    assert (groups[mod_indexes] == groups).all()
+    distinct_ids = pd.Series(IDS).groupby(mod_indexes).nunique()
+    assert (distinct_ids >= 3).sum() >= len(distinct_ids) - 3
+    assert engine.stats["outliers"] == np.isin(mod_indexes, distinct_ids.index[distinct_ids < 3]).sum()
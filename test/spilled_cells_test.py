@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from h3 import geo_to_h3, h3_to_parent, string_to_h3
+from src.application.Hexanonymity.SpilledCells import SpilledCells, h3_parents
+from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+
+RNG = np.random.default_rng(5)
+N = 3000
+LATS, LONS = 42.2 + RNG.random(N) / 100, -8.7 + RNG.random(N) / 100
+IDS = RNG.integers(0, 300, N).astype(str)
+
+
+def test_vectorized_parents():
+    cells = np.array([string_to_h3(geo_to_h3(lat, lon, 15)) for lat, lon in zip(LATS[:50], LONS[:50])], dtype=np.uint64)
+    for p in range(15):
+        expected = [string_to_h3(h3_to_parent(geo_to_h3(lat, lon, 15), p)) for lat, lon in zip(LATS[:50], LONS[:50])]
+        assert h3_parents(cells, p).tolist() == expected
+
+
+def test_spilled_levels_keep_k_anonymity(tmp_path):
+    engine = StrictIdHexAnon(k_anon=3, spill_cells=500, spill_dir=str(tmp_path))
+    mod_indexes = engine.assign(LATS, LONS, IDS)
+
+    assert engine.stats["spilled_levels"] and max(engine.stats["spilled_levels"]) == 15
+    assert engine.stats["overlap_levels"] and max(engine.stats["overlap_levels"]) < min(engine.stats["spilled_levels"])
+    distinct_ids = pd.Series(IDS).groupby(mod_indexes).nunique()
+    assert (distinct_ids >= 3).sum() >= len(distinct_ids) - 1
+    assert (mod_indexes[mod_indexes] == mod_indexes).all()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spilled_levels_run_as_fast_levels(tmp_path):
+    spilled = StrictIdHexAnon(k_anon=3, spill_cells=500, spill_dir=str(tmp_path))
+    spilled.assign(LATS, LONS, IDS)
+    fast = StrictIdHexAnon(k_anon=3, fast_p=min(spilled.stats["spilled_levels"]))
+    fast.assign(LATS, LONS, IDS)
+    in_memory = StrictIdHexAnon(k_anon=3)
+    in_memory.assign(LATS, LONS, IDS)
+
+    assert (spilled.stats["cores"], spilled.stats["outliers"]) == (fast.stats["cores"], fast.stats["outliers"])
+    # without overlaps groups are larger, never less safe
+    assert spilled.stats["outliers"] <= in_memory.stats["outliers"] + N // 100
+    assert 0.6 * in_memory.stats["cores"] <= spilled.stats["cores"] <= in_memory.stats["cores"]
+
+
+def test_chunks_cut_at_cell_boundaries():
+    cells = np.array([string_to_h3(geo_to_h3(lat, lon, 9)) for lat, lon in zip(LATS, LONS)], dtype=np.uint64)
+    results = []
+    for chunk_rows in (7, 10_000):
+        spilled = SpilledCells(k_anon=3, chunk_rows=chunk_rows)
+        spilled.fill(cells, pd.factorize(IDS)[0])
+        mod_indexes = np.arange(N)
+        spilled.group_level(mod_indexes, 9)
+        results.append((mod_indexes, spilled.rows, spilled.n_cells, spilled.core_indxs))
+        spilled.close()
+    for a, b in zip(*results):
+        assert np.array_equal(a, b)
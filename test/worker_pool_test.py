@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.application.Hexanonymity.Hexanonymity import Hexanonimity
+from src.application.Hexanonymity.StrictIdHexAnon import StrictIdHexAnon
+from src.infrastructure.pool.worker_pool import SharedMemoryPool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with SharedMemoryPool(max_workers=2) as pool:
+        yield pool
+
+
+def test_pool_assign_matches_engine(pool):
+    rng = np.random.default_rng(4)
+    lats, lons = 42.2 + rng.random(300) / 50, -8.7 + rng.random(300) / 50
+    ids = rng.integers(0, 40, 300).astype(str)
+    engine = StrictIdHexAnon(k_anon=3)
+
+    (mod_indexes, core_ps, unsafe, stats), (empty, *_) = pool.assign_many(
+        engine, [(lats, lons, ids), (lats[:0], lons[:0], ids[:0])]
+    )
+    distinct_ids = pd.Series(ids).groupby(mod_indexes).nunique()
+    assert (distinct_ids >= 3).sum() >= len(distinct_ids) - 1
+    assert (mod_indexes[mod_indexes] == mod_indexes).all() and stats["points"] == 300
+    assert core_ps.dtype == np.int8 and len(empty) == 0
+    assert unsafe.sum() == stats["outliers"]
+
+
+def test_hexanonimity_with_pool(pool):
+    df = pd.DataFrame(
+        {
+            "a": ["-8.7354573,42.2239522", "-8.7357169,42.224499", "-8.8932563,42.1011589", "-8.8910411,42.08599"],
+            "id": ["1", "2", "1", "2"],
+            "t": [0, 10, 4000, 4010],
+        }
+    )
+    plain = Hexanonimity(configuration={"k": 2, "output": "h3"}, fields=["a"], id_col="id", sensitive_cols=[])
+    pooled = Hexanonimity(configuration={"k": 2, "output": "h3"}, fields=["a"], id_col="id", sensitive_cols=[], pool=pool)
+    pd.testing.assert_frame_equal(pooled.apply(df), plain.apply(df))
+
+    by_time = Hexanonimity(
+        configuration={"k": 2, "time_bucket": "1h"}, fields=["a"], id_col="id", sensitive_cols=[], time_col="t", pool=pool
+    )
+    assert by_time.apply(df)["a"].nunique() == 2